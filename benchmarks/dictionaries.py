@@ -0,0 +1,125 @@
+"""
+Dictionaries used in the benchmarks, modeled on the files in the `example/` folder.
+"""
+
+from typing import Callable, Dict, List
+
+from plover_python_dictionary_lib import get_context_from_system, Dictionary
+
+from .system import english_stenotype as e
+
+context=get_context_from_system(e)
+s=context.SingleDictionary
+stroke=context.stroke
+translation=context.translation
+
+
+def fingerspelling()->Dictionary:
+	"""
+	Same as `example/00_two_letter_fingerspelling_example.py`.
+	"""
+	left_hand=s({
+		'A': 'a', 'PW': 'b', 'KR': 'c', 'TK': 'd', 'TP': 'f', 'TKPW': 'g', 'H': 'h', 'SKWR': 'j', 'K': 'k',
+		'HR': 'l', 'PH': 'm', 'TPH': 'n', 'O': 'o', 'P': 'p', 'KW': 'q', 'R': 'r', 'S': 's', 'T': 't',
+		'SR': 'v', 'W': 'w', 'KP': 'x', 'KWR': 'y', 'STKPW': 'z',
+		})
+	right_hand=s({
+		'-B': 'b', '-D': 'd', 'E': 'e', '-F': 'f', '-G': 'g', '*FD': 'h', 'EU': 'i', '-PBLG': 'j', '-BG': 'k',
+		'-L': 'l', '-PL': 'm', '-PB': 'n', '-P': 'p', '-R': 'r', '-S': 's', '-T': 't', 'U': 'u', '-FB': 'v',
+		'-BGS': 'x', '-FRL': 'y', '-Z': 'z',
+		})
+	leader_stroke="TP*EURPBG"
+	leader_stroke_2="TP*EURPBGS"
+	one_stroke=left_hand | right_hand | left_hand*right_hand
+	return (
+			s({leader_stroke: "{#}", leader_stroke_2: "{#}"}) |
+			(stroke(leader_stroke) | stroke(leader_stroke_2)) / translation("{&") * one_stroke * translation("}") |
+			stroke(leader_stroke_2) / translation("{&") * one_stroke / one_stroke * translation("}")
+			)
+
+
+def emily_modifiers()->Dictionary:
+	"""
+	Same as `example/Emily_modifiers_example.py`.
+	"""
+	spelling=s({
+		"A": "a", "PW": "b", "KR": "c", "TK": "d", "E": "e", "TP": "f", "TKPW": "g", "H": "h", "EU": "i",
+		"AOEU": "i", "SKWR": "j", "SKWRAEU": "j", "K": "k", "HR": "l", "PH": "m", "TPH": "n", "O": "o",
+		"P": "p", "KW": "q", "R": "r", "S": "s", "T": "t", "U": "u", "SR": "v", "W": "w", "KP": "x",
+		"KWR": "y", "STKPW": "z", "STKPWHR": "z",
+		})
+	symbols=s({
+		"TR": ["tab", "delete", "backspace", "escape"],
+		"KPWR": ["up", "left", "right", "down"],
+		"KPWHR": ["pageup", "end", "home", "pagedown"],
+		"": ["", "tab", "return", "space"],
+		"HR": ["exclam", "", "notsign", "exclamdown"],
+		"PH": ["quotedbl", "", "", ""],
+		"TKHR": ["numbersign", "registered", "copyright", ""],
+		"KPWH": ["dollar", "euro", "yen", "sterling"],
+		"PWHR": ["percent", "", "", ""],
+		"SKP": ["ampersand", "", "", ""],
+		"H": ["apostrophe", "", "", ""],
+		"TPH": ["parenleft", "less", "bracketleft", "braceleft"],
+		"KWR": ["parenright", "greater", "bracketright", "braceright"],
+		"T": ["asterisk", "section", "", "multiply"],
+		"K": ["plus", "paragraph", "", "plusminus"],
+		"W": ["comma", "", "", ""],
+		"TP": ["minus", "", "", ""],
+		"R": ["period", "periodcentered", "", ""],
+		"WH": ["slash", "", "", "division"],
+		"TK": ["colon", "", "", ""],
+		"WR": ["semicolon", "", "", ""],
+		"TKPW": ["equal", "", "", ""],
+		"TPW": ["question", "", "questiondown", ""],
+		"TKPWHR": ["at", "", "", ""],
+		"PR": ["backslash", "", "", ""],
+		"KPR": ["asciicircum", "guillemotleft", "guillemotright", "degree"],
+		"KW": ["underscore", "", "", "mu"],
+		"P": ["grave", "", "", ""],
+		"PW": ["bar", "", "", "brokenbar"],
+		"TPWR": ["asciitilde", "", "", ""],
+		}).named("symbol")
+	symbol_variant=(s({"A": 1, "": 0}) * s({"O": 2, "": 0})).named("symbol_variant")
+	count=(
+			s({"R": 1, "": 0}) *
+			s({"W": 2, "": 0}) *
+			s({"K": 4, "": 0}) *
+			s({"S": 8, "": 0})
+			)
+
+	def accumulate_modifiers(character: str, mods: List[str])->str:
+		combo=character
+		for mod in mods:
+			combo=mod + "(" + combo + ")"
+		return "{#" + combo + "}"
+
+	return (
+			(
+				(symbols * symbol_variant * stroke("*")).map(
+					lambda symbol, symbol_variant:
+					(symbol[symbol_variant] or None) if type(symbol) == list else symbol
+					)
+				|
+				stroke("AO") *
+				(
+					s({"TP": "F"}) * count.filter(lambda x: 1 <= x <= 12).map(str) |
+					count.filter(lambda x: x <= 9).map(str)
+					)
+				|
+				spelling.filter(lambda character: character!="")
+				).named("character") *
+			(
+				s({"-R": ["shift"], "": []}) *
+				s({"-F": ["control"], "": []}) *
+				s({"-B": ["alt"], "": []}) *
+				s({"-P": ["super"], "": []})
+				).named("mods") *
+			stroke("LTZ")
+			).map(accumulate_modifiers)
+
+
+DICTIONARIES: Dict[str, Callable[[], Dictionary]]={
+		"fingerspelling": fingerspelling,
+		"emily_modifiers": emily_modifiers,
+		}
@@ -0,0 +1,122 @@
+"""
+Benchmark lookup latency and export throughput.
+
+Run from the repository root with
+
+	python -m benchmarks.run [--output results.json]
+
+The results are printed as JSON so that runs on different commits can be compared.
+"""
+
+import argparse
+import io
+import json
+import platform
+import random
+import subprocess
+import sys
+import time
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+from plover_python_dictionary_lib import Dictionary
+
+from .dictionaries import DICTIONARIES
+from .system import english_stenotype as e
+
+
+def git_revision()->Any:
+	try:
+		return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+	except (OSError, subprocess.CalledProcessError):
+		return None
+
+
+def best_time(function: Callable[[], Any], repeat: int)->float:
+	"""
+	Return the minimum running time of `function()` in seconds over `repeat` runs.
+	"""
+	result=float("inf")
+	for _ in range(repeat):
+		start=time.perf_counter()
+		function()
+		result=min(result, time.perf_counter()-start)
+	return result
+
+
+def sample_outlines(dictionary: Dictionary, count: int, rng: random.Random)->Tuple[List[Tuple[str, ...]], List[Tuple[str, ...]]]:
+	"""
+	Return `count` outlines that are in the dictionary and `count` outlines that are not,
+	as tuples of stroke strings (the format Plover passes to `lookup`).
+	"""
+	keys=[key for key, value in dictionary.items_str()]
+	hits=[tuple(key.split("/")) for key in rng.sample(keys, min(count, len(keys)))]
+	num_keys=len(e.KEYS)
+	misses: List[Tuple[str, ...]]=[]
+	while len(misses)<count:
+		length=rng.randint(1, dictionary.longest_key)
+		outline=tuple(str(dictionary.stroke_type(rng.getrandbits(num_keys))) for _ in range(length))
+		if dictionary.lookup_tuple(outline) is None:
+			misses.append(outline)
+	return hits, misses
+
+
+def lookup_latency(dictionary: Dictionary, outlines: Sequence[Tuple[str, ...]], repeat: int)->float:
+	"""
+	Return the time per `lookup_tuple` call in nanoseconds.
+	"""
+	lookup_tuple=dictionary.lookup_tuple
+	def run()->None:
+		for outline in outlines:
+			lookup_tuple(outline)
+	return best_time(run, repeat)/len(outlines)*1e9
+
+
+def benchmark(name: str, build: Callable[[], Dictionary], repeat: int, samples: int)->Dict[str, Any]:
+	start=time.perf_counter()
+	dictionary=build()
+	build_time=time.perf_counter()-start
+
+	num_items=sum(1 for _ in dictionary.items())
+	items_time=best_time(lambda: sum(1 for _ in dictionary.items()), repeat)
+	export_time=best_time(lambda: dictionary.write_json(io.StringIO()), repeat)
+
+	hits, misses=sample_outlines(dictionary, samples, random.Random(name))
+	return {
+			"build_seconds": build_time,
+			"num_items": num_items,
+			"items_seconds": items_time,
+			"items_per_second": num_items/items_time,
+			"export_seconds": export_time,
+			"export_items_per_second": num_items/export_time,
+			"lookup_hit_ns": lookup_latency(dictionary, hits, repeat),
+			"lookup_miss_ns": lookup_latency(dictionary, misses, repeat),
+			}
+
+
+def main()->None:
+	parser=argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("--repeat", type=int, default=3, help="number of runs of each measurement; the best one is reported")
+	parser.add_argument("--samples", type=int, default=2000, help="number of hit and miss outlines for the lookup measurements")
+	parser.add_argument("--dictionary", action="append", choices=sorted(DICTIONARIES), help="only run the given dictionaries")
+	parser.add_argument("--output", help="write the results to this file instead of the standard output")
+	args=parser.parse_args()
+
+	results={
+			"revision": git_revision(),
+			"python": platform.python_version(),
+			"implementation": platform.python_implementation(),
+			"benchmarks": {
+				name: benchmark(name, DICTIONARIES[name], args.repeat, args.samples)
+				for name in (args.dictionary or DICTIONARIES)
+				},
+			}
+	if args.output:
+		with open(args.output, "w") as f:
+			json.dump(results, f, indent=1)
+	else:
+		json.dump(results, sys.stdout, indent=1)
+		print()
+
+
+if __name__=="__main__":
+	main()
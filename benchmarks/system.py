@@ -0,0 +1,30 @@
+"""
+A stand-in for `plover.system.english_stenotype`, so that the benchmarks can run without Plover installed.
+"""
+
+from types import SimpleNamespace
+
+english_stenotype=SimpleNamespace(
+		KEYS=(
+			'#',
+			'S-', 'T-', 'K-', 'P-', 'W-', 'H-', 'R-',
+			'A-', 'O-',
+			'*',
+			'-E', '-U',
+			'-F', '-R', '-P', '-B', '-L', '-G', '-T', '-S', '-D', '-Z',
+			),
+		IMPLICIT_HYPHEN_KEYS=('A-', 'O-', '5-', '0-', '-E', '-U', '*'),
+		NUMBER_KEY='#',
+		NUMBERS={
+			'S-': '1-',
+			'T-': '2-',
+			'P-': '3-',
+			'H-': '4-',
+			'A-': '5-',
+			'O-': '0-',
+			'-F': '-6',
+			'-P': '-7',
+			'-L': '-8',
+			'-T': '-9',
+			},
+		)
@@ -1,11 +1,16 @@
-from dataclasses import dataclass
-from typing import Dict, TypeVar, Union, NamedTuple, Optional, Any, Callable, List, Iterable, Tuple, Mapping, Sequence
+from dataclasses import dataclass, field
+from typing import Dict, TypeVar, Union, NamedTuple, Optional, Any, Callable, List, Iterable, Iterator, Tuple, Mapping, Sequence, FrozenSet
 from abc import ABC, abstractmethod
+import collections.abc
 import functools
+import struct
 import sys
+import threading
 import operator
 import itertools
 import inspect
+import time
+import weakref
 from types import SimpleNamespace
 from plover_stroke import BaseStroke  # type: ignore
 
@@ -34,13 +39,72 @@ InputStrokesType=Union[InputStrokeType, Iterable[InputStrokeType], Iterable[str]
 
 Strokes=Tuple[BaseStroke, ...]
 
+# Internally, masks are handled as plain int (plover_stroke strokes are int subclasses),
+# because the operators of BaseStroke are much slower than those of int.
+# `int.__new__(stroke_type, mask)` wraps a known-valid mask without validation.
+
+def _submask_table(bits: List[int])->List[int]:
+	"""
+	Return all the unions of subsets of `bits`, ordered such that the first bit changes slowest.
+	"""
+	result=[0]
+	for bit in reversed(bits):
+		result+=[mask|bit for mask in result]
+	return result
+
+def submasks(mask: int)->Iterable[int]:
+	"""
+	Return all the submasks of `mask`, ordered such that the lowest bit changes slowest.
+	"""
+	bits=[1<<i for i in range(mask.bit_length()) if mask>>i&1]
+	high=_submask_table(bits[:len(bits)//2])
+	low=_submask_table(bits[len(bits)//2:])
+	for x in high:
+		for y in low:
+			yield x|y
+
 def subsets(stroke: BaseStroke)->Iterable[BaseStroke]:
 	stroke_type=type(stroke)
-	for keys in itertools.product(*(((), (key,)) for key in stroke.keys())):
-		yield stroke_type(itertools.chain.from_iterable(keys))
+	for mask in submasks(int(stroke)):
+		yield int.__new__(stroke_type, mask)
 
 def outline_union(a: Strokes, b: Strokes)->Strokes:
-	return tuple(map(operator.or_, a, b))
+	return tuple(int.__new__(type(x), int(x)|int(y)) for x, y in zip(a, b))
+
+def outline_masks_of(outlines: Iterable[Sequence[int]])->Dict[int, Tuple[int, ...]]:
+	"""
+	Return a dict from each length of the outlines to the union mask of the outlines with that length.
+	"""
+	result: Dict[int, List[int]]={}
+	for outline in outlines:
+		masks=result.get(len(outline))
+		if masks is None:
+			masks=result[len(outline)]=[0]*len(outline)
+		for i, stroke in enumerate(outline):
+			masks[i]|=int(stroke)
+	return {length: tuple(masks) for length, masks in result.items()}
+
+def union_outline_masks(dictionaries: Iterable["Dictionary"])->Optional[Dict[int, Tuple[int, ...]]]:
+	"""
+	Return the union of the `outline_masks` of the dictionaries, or None if one of them is unknown.
+	"""
+	result: Dict[int, Tuple[int, ...]]={}
+	for dictionary in dictionaries:
+		outline_masks=dictionary.outline_masks()
+		if outline_masks is None: return None
+		for length, masks in outline_masks.items():
+			result[length]=tuple(map(operator.or_, result.get(length, (0,)*length), masks))
+	return result
+
+def outline_mask_of(stroke_type: type, outlines: Iterable[Strokes], length: int)->Strokes:
+	"""
+	Return the union mask of the given outlines, which must all have the given length.
+	"""
+	masks=[0]*length
+	for outline in outlines:
+		for i, stroke in enumerate(outline):
+			masks[i]|=int(stroke)
+	return tuple(int.__new__(stroke_type, mask) for mask in masks)
 
 def outline_union_strip_optional(a: Optional[Strokes], b: Optional[Strokes])->Strokes:
 	assert a
@@ -82,13 +146,54 @@ class Dictionary(ABC):
 			strokes: a tuple of RTF/CRE stroke strings. Example: `("S", "KW")`
 		"""
 		try:
-			strokes_=tuple(map(self.stroke_type, strokes))
+			strokes_=tuple(map(stroke_cache(self.stroke_type).parse, strokes))
 		except ValueError:
 			raise KeyError(strokes)
+		if not self.could_match(strokes_): return None
 		result=self.lookup(strokes_)
 		assert result is None or isinstance(result, str), result
 		return result
 	
+	def lookup_batch(self, outlines: Sequence[Strokes], checked: bool=False)->List[Any]:
+		"""
+		Same as `[self.lookup(strokes) for strokes in outlines]`.
+
+		Subclasses override this to process the whole batch at each node of the tree.
+
+		Arguments:
+			checked: if True, the caller guarantees that every outline has length `outline_length`
+				and is contained in `outline_mask`.
+		"""
+		return [self.lookup(strokes) for strokes in outlines]
+
+	def lookup_many(self, outlines: Iterable[Union[str, Sequence[str]]])->List[LookupResult]:
+		"""
+		Lookup many outlines at once, return the results in order.
+		Faster than calling `lookup_tuple` in a loop.
+
+		Arguments:
+			outlines: RTF/CRE outline strings (like `"S/KW"`) or tuples of stroke strings (like `("S", "KW")`).
+				Unlike `lookup_tuple`, an invalid outline gives None instead of raising `KeyError`.
+		"""
+		parse=stroke_cache(self.stroke_type).parse
+		results: List[LookupResult]=[]
+		by_length: Dict[int, Tuple[List[int], List[Strokes]]]={}
+		for outline in outlines:
+			results.append(None)
+			try:
+				strokes=tuple(map(parse, outline.split("/") if isinstance(outline, str) else outline))
+			except ValueError:
+				continue
+			if not self.could_match(strokes): continue
+			indices, batch=by_length.setdefault(len(strokes), ([], []))
+			indices.append(len(results)-1)
+			batch.append(strokes)
+		for indices, batch in by_length.values():
+			for index, result in zip(indices, self.lookup_batch(batch)):
+				assert result is None or isinstance(result, str), result
+				results[index]=result
+		return results
+
 	@abstractmethod
 	def items(self)->Iterable[Tuple[Strokes, Any]]:
 		"""
@@ -100,34 +205,233 @@ class Dictionary(ABC):
 		for key, value in self.items():
 			yield key
 
+	def items_from(self, outline: Strokes)->Iterable[Tuple[Strokes, Any]]:
+		"""
+		Return the items of `items()`, starting from the first occurrence of `outline`.
+		If the outline is not in the dictionary, nothing is returned.
+
+		Subclasses override this to skip the items before it without enumerating them where possible.
+		"""
+		return itertools.dropwhile(lambda item: item[0]!=outline, self.items())
+
+	def items_page(self, limit: Optional[int]=None, start_after: Optional[InputStrokesType]=None)->Iterable[Tuple[Strokes, Any]]:
+		"""
+		Return a part of `items()` lazily.
+
+		Arguments:
+			limit: the maximum number of returned items.
+			start_after: if given, only the items after the first occurrence of this outline are returned --
+				pass the last outline of the previous page to resume the enumeration.
+		"""
+		items: Iterable[Tuple[Strokes, Any]]
+		if start_after is None:
+			items=self.items()
+		else:
+			outline=to_strokes(self.stroke_type, start_after)
+			# items_from may start a bit earlier, for example if a product drops the item of the outline
+			items=itertools.islice(itertools.dropwhile(lambda item: item[0]!=outline, self.items_from(outline)), 1, None)
+		return itertools.islice(items, limit)
+
+	def count(self)->int:
+		"""
+		Return the number of items in `items()` (including duplicates).
+
+		Computed without enumerating the items where possible.
+		"""
+		return sum(1 for _ in self.items())
+
+	def outline_masks(self)->Optional[Dict[int, Tuple[int, ...]]]:
+		"""
+		Return a dict from each possible outline length to the union mask (as int) of the outlines of that length,
+		or None if the information is unknown.
+
+		Computed once per dictionary.
+		"""
+		if "_outline_masks" not in self.__dict__:
+			self._outline_masks=self._compute_outline_masks()
+		return self._outline_masks
+
+	def _compute_outline_masks(self)->Optional[Dict[int, Tuple[int, ...]]]:
+		if self.longest_key==0: return {}
+		if self.outline_length is not None and self.outline_mask is not None:
+			return {self.outline_length: tuple(map(int, self.outline_mask))}
+		return None
+
+	def could_match(self, strokes: Strokes)->bool:
+		"""
+		Return False if the outline is certainly not in the dictionary (judged only from `outline_masks` and `longest_key`).
+		"""
+		inverse_masks=self.__dict__.get("_inverse_outline_masks")
+		if inverse_masks is None:
+			outline_masks=self.outline_masks()
+			if outline_masks is None: return len(strokes)<=self.longest_key
+			inverse_masks=self._inverse_outline_masks={
+					length: tuple(~mask for mask in masks) for length, masks in outline_masks.items()}
+		masks=inverse_masks.get(len(strokes))
+		if masks is None: return False
+		for stroke, inverse_mask in zip(strokes, masks):
+			if int(stroke)&inverse_mask: return False
+		return True
+
+	def _values_not_callable(self)->bool:
+		"""
+		Return True if it's known that no value of the dictionary is callable
+		(then a product with this dictionary never drops an item).
+		"""
+		return False
+
+	def children(self)->List["Dictionary"]:
+		"""
+		Return the dictionaries this dictionary is directly built from.
+		"""
+		return []
+
 	def items_str(self)->Iterable[Tuple[str, str]]:
-		for key, value in self.items():
-			assert isinstance(value, str), value
-			yield "/".join(str(stroke) for stroke in key), value
+		return items_to_str(self.items())
+
+	def items_with_source(self)->Iterable[Tuple[Strokes, Any, Tuple[str, ...]]]:
+		"""
+		Same as `items()`, but each item also has the path of the components it comes from,
+		such as `("[2]", "named('mods')")` for the item of the component at index 2 of an `AlternativeDictionary`,
+		named `mods`. The path stops at the nodes that combine their children's items, such as products.
+		"""
+		for strokes, value in self.items():
+			yield strokes, value, ()
+
+	def item_partitions(self, count: int)->List[Callable[[], Iterable[Tuple[Strokes, Any]]]]:
+		"""
+		Split `items()` into (about `count`, possibly fewer) parts that can be enumerated independently.
+		Concatenating the results of the parts in order gives `items()`.
+		"""
+		return [self.items]
+
+	def parallel_items(self, workers: Optional[int]=None)->Iterable[Tuple[Strokes, Any]]:
+		"""
+		Same as `items()`, but the items are computed in `workers` processes (default: the number of CPUs).
+
+		The enumeration is split with `item_partitions`. The dictionary is shared with the worker processes
+		by forking, so the user functions need not be picklable, but the values must be.
+		Where forking is not available, this falls back to `items()`.
+		"""
+		stroke_type=self.stroke_type
+		for strokes, value in _parallel_map_partitions(self, workers, _partition_items_int):
+			yield tuple(int.__new__(stroke_type, stroke) for stroke in strokes), value
 
 	def items_str_dict(self)->Dict[str, str]:
 		"""
 		Get the dictionary as a dict from str (RTF/CRE) to str.
 		"""
-		result_items=list(self.items_str())
-		result=dict(result_items)
-		if len(result_items)!=len(result):
-			import logging
-			from collections import defaultdict
-			values_by_key=defaultdict(list)
-			for key, value in result_items:
-				values_by_key[key].append(value)
-			warning_message=', '.join([f'{key}: {values[:10]}' for key, values in values_by_key.items()
-							   if len(values)>1][:10])
-			logging.getLogger(__name__).warn(f"Duplicate items in dictionary. For example {warning_message}")
-		return result
+		return items_str_to_dict(self.items_str())
 
 	def print_items(self)->None:
 		"""
 		Print all items in the dictionary in JSON format.
 		"""
+		self.write_json(sys.stdout)
+
+	def write_json(self, fp: Any, duplicates: str="last", workers: Optional[int]=None)->None:
+		"""
+		Write all items in the dictionary to a text file object in JSON format.
+
+		Arguments:
+			duplicates: what to do with an outline that has several values.
+				"last": keep the last value, at the position of the first one, and log a warning.
+					The output is the same as `json.dump(self.items_str_dict(), fp, ensure_ascii=False, indent=0)`
+					(which is what `print_items` writes).
+				"first": keep the first value (which is what `lookup` returns) and log a warning.
+					The items are written as they are enumerated.
+				"keep": write duplicate JSON keys. The items are written as they are enumerated,
+					without keeping the whole dictionary in memory.
+			workers: if not None, compute the items in that many processes. See `parallel_items`.
+		"""
+		items=self.items_str() if workers is None else _parallel_map_partitions(self, workers, _partition_items_str)
+		write_json_items(fp, items, duplicates)
+
+	def write_json_incremental(self, path: str, state_path: Optional[str]=None)->int:
+		"""
+		Write all items in the dictionary to the file at `path` in JSON format, like `write_json`,
+		reusing the results of the previous run where possible. Return the number of recomputed parts.
+
+		The dictionary is split into parts (the components of the top-level alternative, if any).
+		Each part has a fingerprint of its content (see `content_fingerprint`), which is saved with its items
+		in the state file (default: `path` + ".state"). On the next run, only the parts with a new fingerprint
+		are enumerated again. The output is the same as a full rebuild.
+		"""
 		import json
-		json.dump(self.items_str_dict(), sys.stdout, ensure_ascii=False, indent=0)
+		import os
+		if state_path is None: state_path=path+".state"
+		previous: Dict[str, List[List[str]]]={}
+		try:
+			with open(state_path, encoding="utf-8") as f:
+				state=json.load(f)
+			if state.get("format")==_INCREMENTAL_FORMAT:
+				previous={fingerprint: items for fingerprint, items in state["parts"]}
+		except (OSError, ValueError):
+			pass
+
+		parts=self._components if isinstance(self, AlternativeDictionary) else [self]
+		memo: Dict[int, Optional[str]]={}
+		recomputed=0
+		state_parts: List[Tuple[Optional[str], List[List[str]]]]=[]
+		for part in parts:
+			fingerprint=content_fingerprint(part, memo)
+			if fingerprint is not None and fingerprint in previous:
+				items=previous[fingerprint]
+			else:
+				items=[[key, value] for key, value in part.items_str()]
+				recomputed+=1
+			state_parts.append((fingerprint, items))
+
+		for target, write in (
+				(path, lambda f: write_json_items(f, (item for _, items in state_parts for item in items))),
+				(state_path, lambda f: json.dump({"format": _INCREMENTAL_FORMAT,
+					"parts": [[fingerprint, items] for fingerprint, items in state_parts if fingerprint is not None]},
+					f, ensure_ascii=False)),
+				):
+			with open(target+".tmp", "w", encoding="utf-8") as f:
+				write(f)
+			os.replace(target+".tmp", target)
+		return recomputed
+
+	def analyze_conflicts(self, external: Union[None, str, "Dictionary"]=None)->"ConflictReport":
+		"""
+		Enumerate the dictionary once and report the duplicate outlines and the components they come from
+		(see `items_with_source`).
+
+		Only the first value and source of each distinct outline is remembered,
+		plus the details of the outlines that actually collide.
+
+		Arguments:
+			external: another dictionary, or the path of a JSON dictionary file (loaded in compact form),
+				to report the outlines that are also defined there.
+		"""
+		if isinstance(external, str):
+			external=SingleDictionary.from_json_file(self.stroke_type, external, compact=True)
+		report=ConflictReport()
+		source_ids: Dict[Tuple[str, ...], int]={}
+		first: Dict[Tuple[int, ...], Tuple[int, Any]]={}
+		for strokes, value, source in self.items_with_source():
+			report.items+=1
+			source_id=source_ids.setdefault(source, len(source_ids))
+			if source_id==len(report.sources):
+				report.sources.append(" ".join(source) or "<root>")
+			key=tuple(map(int, strokes))
+			if key in first:
+				first_source_id, first_value=first[key]
+				outline="/".join(str(stroke) for stroke in strokes)
+				if outline not in report.duplicates:
+					report.duplicates[outline]=[(report.sources[first_source_id], first_value)]
+				report.duplicates[outline].append((report.sources[source_id], value))
+				pair=(report.sources[first_source_id], report.sources[source_id])
+				report.collisions[pair]=report.collisions.get(pair, 0)+1
+				continue
+			first[key]=source_id, value
+			if external is not None:
+				external_value=external.lookup(strokes)
+				if external_value is not None:
+					report.external["/".join(str(stroke) for stroke in strokes)]=(report.sources[source_id], value, external_value)
+		report.outlines=len(first)
+		return report
 
 	def __or__(self, other: "Dictionary")->"Dictionary":
 		"""
@@ -169,6 +473,110 @@ class Dictionary(ABC):
 	def named(self, name: str)->"NamedDictionary":
 		return NamedDictionary(self.stroke_type, self, name)
 
+	def optimize(self)->"Dictionary":
+		"""
+		Return an equivalent dictionary (same `lookup` and `items` results, in the same order)
+		that is faster to evaluate. This dictionary is not modified.
+
+		* filters that only read the groups of one named side of a product are applied on that side,
+		* adjacent `map`/`filter` functions are applied by a single node,
+		* chains of products `a*b*c*...` are evaluated by a single node
+			(also `a*(b*c)`, if none of the values of the factors is callable),
+		* adjacent alternatives of `SingleDictionary` with distinct outlines are merged.
+		"""
+		return _optimize_node(self, {})
+
+	def compiled(self)->"CompiledDictionary":
+		"""
+		Enumerate the dictionary once and return an equivalent dictionary backed by a single hash table.
+
+		Lookups in the result are a single dict probe instead of a walk over the whole tree.
+		If an outline appears more than once in `items()`, the first value is kept,
+		which matches the result of `lookup`.
+		"""
+		return CompiledDictionary(self.stroke_type, self)
+
+	def cached(self, maxsize: Optional[int]=1024)->"CachedDictionary":
+		"""
+		Return an equivalent dictionary that remembers the results (including misses) of the most recent lookups.
+
+		Arguments:
+			maxsize: the maximum number of remembered outlines, or None for no limit.
+		"""
+		return CachedDictionary(self.stroke_type, self, maxsize)
+
+	def instrumented(self)->"Instrumentation":
+		"""
+		Return a context manager that records statistics of `lookup` and `items` calls
+		of every node in this dictionary while it is active. Example::
+
+			with dictionary.instrumented() as instrumentation:
+				dictionary.print_items()
+			print(instrumentation.report(), file=sys.stderr)
+
+		There's no overhead when the context manager is not active.
+		"""
+		return Instrumentation(self)
+
+	def memoized(self, max_bytes: Optional[int]=256<<20, structural: bool=False, lookup_cache_size: int=65536)->"SharedMemo":
+		"""
+		Return a context manager that, while active, shares one memoized `items()` enumeration
+		and one lookup cache between all the occurrences of each node used more than once in this dictionary. Example::
+
+			with dictionary.memoized() as memo:
+				dictionary.print_items()
+			print(memo.report(), file=sys.stderr)
+
+		See `SharedMemo` for the arguments. For a Plover session, call `activate()` once instead.
+		"""
+		return SharedMemo(self, max_bytes=max_bytes, structural=structural, lookup_cache_size=lookup_cache_size)
+
+	def reverse_index(self, path: Optional[str]=None)->"ReverseIndex":
+		"""
+		Return the index from translations to outlines of this dictionary, building it on first use.
+
+		Arguments:
+			path: if given, the index is loaded from this file if it was saved for the same content
+				(see `content_fingerprint`), otherwise it's built and saved to this file.
+		"""
+		indexes: Dict[Optional[str], ReverseIndex]=self.__dict__.setdefault("_reverse_indexes", {})
+		index=indexes.get(path)
+		if index is None:
+			key=None if path is None else content_fingerprint(self)
+			if path is not None and key is not None:
+				index=ReverseIndex.load(path, key)
+			if index is None:
+				index=next(iter(indexes.values()), None) or ReverseIndex(self.items_str())
+				if path is not None: index.save(path, key)
+			indexes[path]=index
+		return index
+
+	def reverse_lookup(self, translation: str)->List[Tuple[str, ...]]:
+		"""
+		Return the outlines that translate to `translation`, as tuples of RTF/CRE stroke strings,
+		in the order of `items()`.
+
+		The first call builds an index of the whole dictionary, see `reverse_index`.
+		"""
+		return self.reverse_index().lookup(translation)
+
+	def stroke_trie(self)->"StrokeTrie":
+		"""
+		Return the trie of the outlines of this dictionary, building it on first use.
+		"""
+		trie: Optional[StrokeTrie]=self.__dict__.get("_stroke_trie")
+		if trie is None:
+			trie=self._stroke_trie=StrokeTrie(self.stroke_type, self.items())
+		return trie
+
+	def segment(self, strokes: Iterable[InputStrokeType])->Iterator[Tuple[Strokes, Any]]:
+		"""
+		Translate a stream of strokes by greedy longest match. See `StrokeTrie.segment`.
+
+		The first call builds a trie of the whole dictionary, see `stroke_trie`.
+		"""
+		return self.stroke_trie().segment(strokes)
+
 	def __str__(self)->str:
 		"""
 		Pretty-print this dictionary.
@@ -176,9 +584,20 @@ class Dictionary(ABC):
 		return self.__class__.__name__ + "(" + str(dict(self)) + ")"
 
 	def __repr__(self)->str:
-		return str(self)
-
-	outline_length: Optional[int]
+		"""
+		Same as `str()`, but only the first few items are shown.
+		"""
+		limit=20
+		data: Dict[Strokes, Any]={}
+		items=list(self.items_page(limit=limit+1))
+		for key, value in items[:limit]:
+			data.setdefault(key, value)
+		result=str(data)
+		if len(items)>limit:
+			result=result[:-1]+", ...}"
+		return self.__class__.__name__ + "(" + result + ")"
+
+	outline_length: Optional[int]=None
 	"""
 	The length of the outlines in the dictionary, or None if the information is unknown.
 	"""
@@ -188,22 +607,167 @@ class Dictionary(ABC):
 	The longest_key in the dictionary.
 	"""
 
-	outline_mask: Optional[Strokes]
+	outline_mask: Optional[Strokes]=None
 	"""
 	The union mask of the outlines in the dictionary, or None if the information is unknown.
 	"""
 
+	group_names: Optional[FrozenSet[str]]=None
+	"""
+	The names of the groups in the CompoundResult values of the dictionary
+	(empty if the values are not CompoundResult), or None if the information is unknown.
+	"""
+
+	group_layout: Optional[Tuple[str, ...]]=None
+	"""
+	The `names` shared by all the CompoundResult values of the dictionary
+	(empty if the values are not CompoundResult), or None if the information is unknown.
+	"""
+
+
+def _warn_duplicates(values_by_key: Dict[str, List[str]], message: str)->None:
+	if values_by_key:
+		import logging
+		warning_message=', '.join([f'{key}: {values[:10]}' for key, values in values_by_key.items()][:10])
+		logging.getLogger(__name__).warning(f"{message} For example {warning_message}")
+
+
+def items_str_to_dict(items: Iterable[Tuple[str, str]])->Dict[str, str]:
+	"""
+	Same as `dict(items)` (the last value of each outline is kept, at the position of the first one),
+	but log a warning with all the values of some duplicated outlines.
+	"""
+	result: Dict[str, str]={}
+	values_by_key: Dict[str, List[str]]={}  # only the duplicated keys
+	for key, value in items:
+		if key in result:
+			values_by_key.setdefault(key, [result[key]]).append(value)
+		result[key]=value
+	_warn_duplicates(values_by_key, "Duplicate items in dictionary.")
+	return result
+
+
+def write_json_items(fp: Any, items: Iterable[Tuple[str, str]], duplicates: str="last")->None:
+	"""
+	Write items (RTF/CRE outline, translation) to a text file object in JSON format. See `Dictionary.write_json`.
+	"""
+	from json.encoder import encode_basestring  # type: ignore
+	assert duplicates in ("last", "first", "keep"), duplicates
+	if duplicates=="last":
+		items=items_str_to_dict(items).items()
+	seen: set=set()
+	dropped_values: Dict[str, List[str]]={}  # only the duplicated keys
+	separator="{\n"
+	for key, value in items:
+		if duplicates=="first":
+			if key in seen:
+				dropped_values.setdefault(key, []).append(value)
+				continue
+			seen.add(key)
+		fp.write(separator+encode_basestring(key)+": "+encode_basestring(value))
+		separator=",\n"
+	fp.write("{}" if separator=="{\n" else "\n}")
+	_warn_duplicates(dropped_values, "Duplicate items in dictionary (only the first value is kept, the values listed are dropped).")
+
+
+def items_to_str(items: Iterable[Tuple[Strokes, Any]])->Iterable[Tuple[str, str]]:
+	for key, value in items:
+		assert isinstance(value, str), value
+		yield "/".join(str(stroke) for stroke in key), value
+
+
+# partitions of the dictionary being enumerated by parallel_items, inherited by the forked worker processes
+_parallel_partitions: List[Callable[[], Iterable[Tuple[Strokes, Any]]]]=[]
+
+def _partition_items_int(index: int)->List[Tuple[Tuple[int, ...], Any]]:
+	return [(tuple(map(int, strokes)), value) for strokes, value in _parallel_partitions[index]()]
+
+def _partition_items_str(index: int)->List[Tuple[str, str]]:
+	return list(items_to_str(_parallel_partitions[index]()))
+
+def _parallel_map_partitions(dictionary: "Dictionary", workers: Optional[int], function: Callable[[int], List[Any]])->Iterable[Any]:
+	"""
+	Compute `function(i)` for each partition of the dictionary in worker processes, return the concatenated results in order.
+	"""
+	import multiprocessing
+	global _parallel_partitions
+	if workers is None: workers=multiprocessing.cpu_count()
+	if workers<=1 or "fork" not in multiprocessing.get_all_start_methods():
+		partitions=[dictionary.items]
+	else:
+		partitions=dictionary.item_partitions(workers*4)
+	if len(partitions)<=1:
+		if function is _partition_items_str:
+			yield from dictionary.items_str()
+		else:
+			yield from ((tuple(map(int, strokes)), value) for strokes, value in dictionary.items())
+		return
+
+	from concurrent.futures import ProcessPoolExecutor
+	assert not _parallel_partitions, "parallel_items cannot be nested"
+	_parallel_partitions=partitions
+	try:
+		with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("fork")) as executor:
+			for result in executor.map(function, range(len(partitions))):
+				yield from result
+	finally:
+		_parallel_partitions=[]
+
+
+class StrokeCache:
+	"""
+	A bounded cache from RTF/CRE stroke strings to strokes of a stroke type.
+	Invalid strings are remembered too, and raise `ValueError` like the stroke type itself.
+
+	When the cache is full, it is cleared.
+	"""
+	def __init__(self, stroke_type: type, maxsize: int=65536)->None:
+		self.stroke_type=stroke_type
+		self.maxsize=maxsize
+		self._strokes: Dict[str, Optional[BaseStroke]]={}
+
+	def parse(self, text: str)->BaseStroke:
+		try:
+			result=self._strokes[text]
+		except KeyError:
+			try:
+				result=self.stroke_type(text)
+			except ValueError:
+				result=None
+			if len(self._strokes)>=self.maxsize:
+				self._strokes.clear()
+			self._strokes[text]=result
+		if result is None:
+			raise ValueError(f"invalid stroke: {text!r}")
+		return result
+
+
+_stroke_caches: "weakref.WeakKeyDictionary[type, StrokeCache]"=weakref.WeakKeyDictionary()
+
+def stroke_cache(stroke_type: type)->StrokeCache:
+	"""
+	Return the `StrokeCache` of the stroke type, creating it if the stroke type does not have one yet.
+	"""
+	cache=_stroke_caches.get(stroke_type)
+	if cache is None:
+		cache=_stroke_caches.setdefault(stroke_type, StrokeCache(stroke_type))
+	return cache
+
 
 def to_stroke(stroke_type: type, stroke: InputStrokeType)->BaseStroke:
 	# with the assertion
 	assert isinstance(stroke, str) or isinstance(stroke, stroke_type), stroke
+	if type(stroke) is stroke_type:
+		return stroke  # type: ignore
+	if isinstance(stroke, str):
+		return stroke_cache(stroke_type).parse(stroke)
 	return stroke_type(stroke)
 
 
 def to_strokes(stroke_type: type, strokes: InputStrokesType)->Strokes:
 	if isinstance(strokes, str):
 		# plover.steno.STROKE_DELIMITER
-		return tuple(stroke_type(stroke) for stroke in strokes.split("/"))
+		return tuple(map(stroke_cache(stroke_type).parse, strokes.split("/")))
 	elif isinstance(strokes, BaseStroke):
 		return (strokes,)
 	elif isinstance(strokes, Iterable): # must handle str case before this one
@@ -212,11 +776,59 @@ def to_strokes(stroke_type: type, strokes: InputStrokesType)->Strokes:
 		assert False, strokes
 
 
-class CompoundResult(NamedTuple):
+class CompoundResult:
 	"""
 	Represent the lookup result of a product of dictionaries, or similar.
+
+	Can be constructed either from a dict `CompoundResult({name: value})` (or `CompoundResult(data={...})`)
+	or from `CompoundResult(names=names, values=values)`. In the latter case the values of the groups are stored in the order of `names`, which is usually
+	the `group_layout` tuple of the dictionary, shared by all its results, and the dict `data` is only created when needed.
+
+	`data` is the same dict every time it's accessed, and modifying it modifies the result.
 	"""
-	data: Dict[str, Any]
+	__slots__=("_names", "_values", "_data")
+
+	def __init__(self, data: Optional[Dict[str, Any]]=None, *, names: Optional[Tuple[str, ...]]=None, values: Optional[Tuple[Any, ...]]=None)->None:
+		if names is None:
+			assert values is None
+			self._data: Optional[Dict[str, Any]]={} if data is None else data
+		else:
+			assert data is None and values is not None and len(names)==len(values), (names, values)
+			self._names=names
+			self._values=values
+			self._data=None
+
+	@classmethod
+	def from_dict(cls, data: Dict[str, Any])->"CompoundResult":
+		return cls(data)
+
+	@property
+	def names(self)->Tuple[str, ...]:
+		if self._data is None: return self._names  # type: ignore
+		return tuple(self._data)
+
+	@property
+	def values(self)->Tuple[Any, ...]:
+		if self._data is None: return self._values
+		return tuple(self._data.values())
+
+	@property
+	def data(self)->Dict[str, Any]:
+		if self._data is None:
+			self._data=dict(zip(self._names, self._values))
+		return self._data
+
+	def __eq__(self, other: Any)->bool:
+		if not isinstance(other, CompoundResult): return NotImplemented
+		return self.data==other.data
+
+	__hash__=None  # type: ignore
+
+	def __repr__(self)->str:
+		return f"CompoundResult(data={self.data!r})"
+
+	def __reduce__(self)->Any:
+		return (CompoundResult, (self.data,))
 
 
 class RawMappedDictionary(Dictionary):
@@ -232,19 +844,48 @@ class RawMappedDictionary(Dictionary):
 		self.outline_length=wrapped.outline_length
 		self.outline_mask=wrapped.outline_mask
 		self.raw_mapped_function=function
+		self.group_names=None
+		self.group_layout=None
 
 	def lookup(self, strokes: Strokes)->Any:
 		result=self.wrapped.lookup(strokes)
 		if result is None: return None
 		return self.raw_mapped_function(strokes, result)
 
+	def lookup_batch(self, outlines: Sequence[Strokes], checked: bool=False)->List[Any]:
+		function=self.raw_mapped_function
+		return [None if result is None else function(strokes, result)
+				for strokes, result in zip(outlines, self.wrapped.lookup_batch(outlines, checked))]
+
+	def children(self)->List[Dictionary]:
+		return [self.wrapped]
+
 	def items(self)->Iterable[Tuple[Strokes, Any]]:
-		for strokes, value in self.wrapped.items():
+		return self._map_items(self.wrapped.items())
+
+	def items_from(self, outline: Strokes)->Iterable[Tuple[Strokes, Any]]:
+		# the function may drop the first occurrences of the outline
+		return itertools.dropwhile(lambda item: item[0]!=outline, self._map_items(self.wrapped.items_from(outline)))
+
+	def _compute_outline_masks(self)->Optional[Dict[int, Tuple[int, ...]]]:
+		return self.wrapped.outline_masks()
+
+	def _map_items(self, items: Iterable[Tuple[Strokes, Any]])->Iterable[Tuple[Strokes, Any]]:
+		for strokes, value in items:
 			assert value is not None
 			transformed_value=self.raw_mapped_function(strokes, value)
 			if transformed_value is not None:
 				yield strokes, transformed_value
 
+	def items_with_source(self)->Iterable[Tuple[Strokes, Any, Tuple[str, ...]]]:
+		for strokes, value, source in self.wrapped.items_with_source():
+			transformed_value=self.raw_mapped_function(strokes, value)
+			if transformed_value is not None:
+				yield strokes, transformed_value, source
+
+	def item_partitions(self, count: int)->List[Callable[[], Iterable[Tuple[Strokes, Any]]]]:
+		return [functools.partial(lambda part: self._map_items(part()), part) for part in self.wrapped.item_partitions(count)]
+
 
 class NamedDictionary(RawMappedDictionary):
 	"""
@@ -258,10 +899,113 @@ class NamedDictionary(RawMappedDictionary):
 		assert not isinstance(wrapped, NamedDictionary), f"Cannot name already-named result -- old names: {wrapped.name}, new name: {self.name}"
 		self.name: str=name
 		super().__init__(stroke_type, wrapped, self.name_result)
+		self.group_names=frozenset((name,))
+		self.group_layout=(name,)
+
+	def count(self)->int:
+		return self.wrapped.count()
+
+	def _values_not_callable(self)->bool:
+		return True
+
+	def items_with_source(self)->Iterable[Tuple[Strokes, Any, Tuple[str, ...]]]:
+		label=f"named({self.name!r})"
+		for strokes, value, source in super().items_with_source():
+			yield strokes, value, (label,)+source
 
 	def name_result(self, _strokes: Strokes, result: Any)->CompoundResult:
-		assert not isinstance(result, CompoundResult), f"Cannot name already-named result -- old names: {list(result.data.keys())}, new name: {self.name}"
-		return CompoundResult({self.name: result})
+		assert not isinstance(result, CompoundResult), f"Cannot name already-named result -- old names: {list(result.names)}, new name: {self.name}"
+		return CompoundResult(names=self.group_layout, values=(result,))
+
+
+class FunctionSignature(NamedTuple):
+	"""
+	The result of the argument introspection of a function passed to `map` or `filter`.
+	"""
+	include_strokes: bool
+	arg_names: Optional[FrozenSet[str]]  # None if the function accepts arbitrary keyword arguments or cannot be inspected
+	required_arg_names: FrozenSet[str]
+
+
+def function_signature(function: Callable)->FunctionSignature:
+	try:
+		argspec=inspect.getfullargspec(function)
+	except TypeError:  # for built-in functions like str
+		return FunctionSignature(False, None, frozenset())
+	include_strokes=argspec.varkw is not None or "strokes" in argspec.args
+	try:
+		# unlike getfullargspec, this drops the receiver of bound methods and callable instances
+		parameters=inspect.signature(function, follow_wrapped=False).parameters.values()
+	except (TypeError, ValueError):
+		return FunctionSignature(include_strokes, None, frozenset())
+	if any(parameter.kind in (parameter.VAR_KEYWORD, parameter.POSITIONAL_ONLY) for parameter in parameters):
+		return FunctionSignature(include_strokes, None, frozenset())
+	names=[parameter.name for parameter in parameters if parameter.kind!=parameter.VAR_POSITIONAL]
+	required=[parameter.name for parameter in parameters
+			if parameter.kind!=parameter.VAR_POSITIONAL and parameter.default is parameter.empty]
+	return FunctionSignature(
+			include_strokes=include_strokes,
+			arg_names=frozenset(names),
+			required_arg_names=frozenset(required),
+			)
+
+
+def function_used_arguments(function: Callable)->Optional[FrozenSet[str]]:
+	"""
+	Return the names of the parameters that the function actually reads,
+	or None if it cannot be determined (for example the function takes `**kwargs`).
+	"""
+	code=getattr(function, "__code__", None)
+	if code is None or inspect.ismethod(function) or not inspect.isfunction(function): return None
+	if code.co_flags & (inspect.CO_VARARGS | inspect.CO_VARKEYWORDS): return None
+	if {"locals", "vars", "eval", "exec"} & {*code.co_names}: return None
+	parameters=frozenset(code.co_varnames[:code.co_argcount+code.co_kwonlyargcount])
+	import dis
+	used={*code.co_cellvars}  # read by nested functions
+	for instruction in dis.get_instructions(code):
+		if instruction.opname.startswith("LOAD_FAST") or instruction.opname=="DELETE_FAST":
+			argval=instruction.argval
+			used.update(argval if isinstance(argval, tuple) else (argval,))
+	return parameters&used
+
+
+def check_function_arguments(function: Callable, group_names: Optional[FrozenSet[str]])->None:
+	"""
+	Check that the function can be applied on results with the given group names (see `apply_function`).
+	Raises `TypeError` on a mismatch. Does nothing if not enough information is known.
+	"""
+	if not group_names: return
+	signature=function_signature(function)
+	if signature.arg_names is None: return
+	missing=group_names-signature.arg_names
+	if missing:
+		raise TypeError(f"Function {function!r} does not accept the group(s) {sorted(missing)} -- available groups: {sorted(group_names)}")
+	unknown=signature.required_arg_names-group_names-{"strokes"}
+	if unknown:
+		raise TypeError(f"Function {function!r} requires the argument(s) {sorted(unknown)} which are not group names -- available groups: {sorted(group_names)}")
+
+
+def function_adapter(function: Callable)->Callable[[Strokes, Any], Any]:
+	"""
+	Return a function `f(strokes, result)` that is equivalent to `apply_function(function, strokes, result)`.
+
+	The signature of the function is only inspected once.
+	"""
+	if function_signature(function).include_strokes:
+		def adapter(strokes: Strokes, result: Any)->Any:
+			assert result is not None
+			if isinstance(result, CompoundResult):
+				assert "strokes" not in result.names
+				return function(strokes=strokes, **dict(zip(result.names, result.values)))
+			return function(strokes=strokes, result=result)
+	else:
+		def adapter(strokes: Strokes, result: Any)->Any:
+			assert result is not None
+			if isinstance(result, CompoundResult):
+				assert "strokes" not in result.names
+				return function(**dict(zip(result.names, result.values)))
+			return function(result)
+	return adapter
 
 
 def apply_function(function: Callable, strokes: Strokes, result: Any)->Any:
@@ -281,41 +1025,35 @@ def apply_function(function: Callable, strokes: Strokes, result: Any)->Any:
 		All available group names must be provided.
 	f(name1, name2, name3, strokes): Same as above, also take the strokes.
 	f(**kwargs): Same as above. kwargs["strokes"] will be available.
-	
-	"""
-	include_strokes: bool=False
-	try:
-		argspec=inspect.getfullargspec(function)
-		include_strokes=argspec.varkw is not None or "strokes" in argspec.args
-	except TypeError:  # for built-in functions like str
-		pass
-
-	assert result is not None
-	if isinstance(result, CompoundResult):
-		assert "strokes" not in result.data
-		if include_strokes:
-			return function(strokes=strokes, **result.data)
-		else:
-			return function(**result.data)
 
-	else:
-		if include_strokes:
-			return function(strokes=strokes, result=result)
-		else:
-			return function(result)
+	`MappedDictionary` and `FilteredDictionary` use `function_adapter` instead,
+	so that the signature is only inspected once.
+	"""
+	return function_adapter(function)(strokes, result)
 
 
 class MappedDictionary(RawMappedDictionary):
 	def __init__(self, stroke_type: type, wrapped: Dictionary, function: Callable[..., Any])->None:
-		super().__init__(stroke_type, wrapped, functools.partial(apply_function, function))
+		check_function_arguments(function, wrapped.group_names)
+		super().__init__(stroke_type, wrapped, function_adapter(function))
 		self.mapped_function=function
+		self.group_names=frozenset()
+		self.group_layout=()
 
 
 class FilteredDictionary(RawMappedDictionary):
 	def __init__(self, stroke_type: type, wrapped: Dictionary, condition: Callable[..., Any])->None:
+		check_function_arguments(condition, wrapped.group_names)
+		adapter=function_adapter(condition)
 		super().__init__(stroke_type, wrapped,
-				lambda strokes, result: result if apply_function(condition, strokes, result) else None
+				lambda strokes, result: result if adapter(strokes, result) else None
 				)
+		self.condition=condition
+		self.group_names=wrapped.group_names
+		self.group_layout=wrapped.group_layout
+
+	def _values_not_callable(self)->bool:
+		return self.wrapped._values_not_callable()
 
 
 class SingleDictionary(Dictionary):
@@ -324,8 +1062,16 @@ class SingleDictionary(Dictionary):
 	"""
 	def __init__(self, stroke_type: type, data: Union[Iterable[InputStrokesType], Dict[InputStrokesType, Any]])->None:
 		super().__init__(stroke_type)
-		self.data: Dict[Strokes, Any]
-		if isinstance(data, Mapping):
+		self.group_names=frozenset()
+		self.group_layout=()
+		self.data: Mapping[Strokes, Any]
+		if isinstance(data, PackedOutlineTable):
+			self.data=data
+			self.outline_length=data.outline_length
+			self.longest_key=data.longest_key
+			self.outline_mask=data.outline_mask
+			return
+		elif isinstance(data, Mapping):
 			self.data={to_strokes(stroke_type, key): value for key, value in data.items()}
 		elif isinstance(data, Iterable):
 			self.data={to_strokes(stroke_type, strokes): strokes for strokes in data}
@@ -335,24 +1081,61 @@ class SingleDictionary(Dictionary):
 		if not self.data:
 			self.outline_length=0
 			self.longest_key=0
+			self.outline_mask=None
 			return
 
 		self.outline_length=len(next(iter(self.data.keys())))
 		self.longest_key=max(len(strokes) for strokes in self.data.keys())
 		if any(len(strokes)!=self.outline_length for strokes in self.data.keys()):
 			self.outline_length=None
+			self.outline_mask=None
 		else:
-			self.outline_mask=functools.reduce(
-					outline_union,
-					self.data.keys()
-					)
+			self.outline_mask=outline_mask_of(stroke_type, self.data.keys(), self.outline_length)
+
+	@classmethod
+	def from_json_file(cls, stroke_type: type, path: str, compact: bool=False)->"SingleDictionary":
+		"""
+		Load a JSON dictionary file (in the format written by `print_items`).
+
+		Arguments:
+			compact: if True, store the data in a `PackedOutlineTable` instead of a dict,
+				which takes much less memory for large dictionaries at the cost of slower lookups.
+		"""
+		import json
+		with open(path, encoding="utf-8") as f:
+			data=json.load(f)
+		if not compact:
+			return cls(stroke_type, data)
+		buffer=PackedOutlineTable.pack((to_strokes(stroke_type, key), value) for key, value in data.items())
+		del data
+		return cls(stroke_type, PackedOutlineTable(stroke_type, buffer))
 
 	def lookup(self, strokes: Strokes)->Any:
 		return self.data.get(strokes)
 
+	def lookup_batch(self, outlines: Sequence[Strokes], checked: bool=False)->List[Any]:
+		return list(map(self.data.get, outlines))
+
 	def items(self)->Iterable[Tuple[Strokes, Any]]:
 		return self.data.items()
 
+	def items_from(self, outline: Strokes)->Iterable[Tuple[Strokes, Any]]:
+		if outline not in self.data: return ()
+		return super().items_from(outline)
+
+	def count(self)->int:
+		return len(self.data)
+
+	def _compute_outline_masks(self)->Optional[Dict[int, Tuple[int, ...]]]:
+		if isinstance(self.data, PackedOutlineTable):
+			return self.data.outline_masks()
+		return outline_masks_of(self.data.keys())
+
+	def _values_not_callable(self)->bool:
+		if "_not_callable" not in self.__dict__:
+			self._not_callable=not any(callable(value) for value in self.data.values())
+		return self._not_callable
+
 	def __iter__(self)->Iterable[Strokes]:
 		return self.data.__iter__()
 
@@ -366,12 +1149,81 @@ class SingleDictionary(Dictionary):
 		return self.data.__contains__(strokes)
 
 
+def merge_values(value_a: Any, value_b: Any, group_layout: Optional[Tuple[str, ...]])->Any:
+	"""
+	Merge the values of the two operands of a product. See `ProductDictionary.merge_value`.
+
+	Arguments:
+		group_layout: the `group_layout` of the product, or None if unknown.
+	"""
+	# return CompoundResult if either argument is CompoundResult (lookup result of a named dictionary)
+	# might also return None (nothing)
+	if isinstance(value_a, CompoundResult):
+		# the non-CompoundResult part is silently dropped;
+		# a new object is returned because the results are mutable and the operands may be shared by several items
+		if not isinstance(value_b, CompoundResult): return CompoundResult(names=value_a.names, values=value_a.values)
+		if group_layout is None or value_a._data is not None or value_b._data is not None:
+			group_layout=value_a.names+value_b.names  # the data may have been modified, so the layout might not apply
+		return CompoundResult(names=group_layout, values=value_a.values+value_b.values)
+	elif isinstance(value_b, CompoundResult):
+		return CompoundResult(names=value_b.names, values=value_b.values)
+	if callable(value_a) and not callable(value_b):
+		return value_a(value_b)
+	if callable(value_b) and not callable(value_a):
+		return value_b(value_a)
+	try:
+		return value_a+value_b
+	except TypeError:
+		raise TypeError(f"Unsupported result types -- Left result: {value_a!r}, right result: {value_b!r}")
+
+
+def paired_items(left_items: Iterable[Tuple[Strokes, Any]], right: Dictionary, cache_limit: Optional[int])->Iterable[Tuple[Strokes, Any, Iterable[Tuple[Strokes, Any]]]]:
+	"""
+	For each left item, yield it together with the items of `right` to pair it with, which must be fully
+	enumerated before the next left item is requested.
+
+	The items of `right` are recorded while they are enumerated for the first left item,
+	and replayed for the next ones, unless there is only one left item or more than `cache_limit` right items.
+	"""
+	left_iterator=iter(left_items)
+	first=next(left_iterator, None)
+	if first is None: return
+	second=next(left_iterator, None)
+	if second is None:
+		yield first[0], first[1], right.items()
+		return
+	recorded: Optional[List[Tuple[Strokes, Any]]]=[]
+	def record()->Iterable[Tuple[Strokes, Any]]:
+		nonlocal recorded
+		for item in right.items():
+			if recorded is not None:
+				recorded.append(item)
+				if cache_limit is not None and len(recorded)>cache_limit: recorded=None
+			yield item
+	yield first[0], first[1], record()
+	for strokes, value in itertools.chain((second,), left_iterator):
+		yield strokes, value, (right.items() if recorded is None else recorded)
+
+
 class ProductDictionary(Dictionary):
+	items_cache_limit: Optional[int]=None
+	"""
+	The maximum number of items of the right operand that `items()` keeps in memory
+	instead of enumerating the right operand again for each item of the left operand,
+	or None for no limit. Can be set on the class or on an instance.
+	"""
+
 	def __init__(self, stroke_type: type, a: Dictionary, b: Dictionary, merge: bool)->None:
 		super().__init__(stroke_type)
 		self.a=a
 		self.b=b
 		self.merge=merge
+		self.group_names=None if a.group_names is None or b.group_names is None else a.group_names|b.group_names
+		if a.group_names is not None and b.group_names is not None:
+			duplicate_names=a.group_names&b.group_names
+			assert not duplicate_names, f"Duplicate group names in product: {sorted(duplicate_names)}"
+		# the names of the merged results, if both operands have a fixed layout
+		self.group_layout=None if a.group_layout is None or b.group_layout is None else a.group_layout+b.group_layout
 		assert a.outline_length
 		assert b.outline_length
 		assert a.outline_mask
@@ -385,23 +1237,16 @@ class ProductDictionary(Dictionary):
 			self.outline_mask=a.outline_mask[:-1]+(x|y,)+b.outline_mask[1:]
 		else:
 			self.outline_mask=a.outline_mask+b.outline_mask
+		self._inverse_masks=tuple(~int(mask) for mask in self.outline_mask)
+		self._split=a.outline_length
+		self._a_last_mask=int(a.outline_mask[-1])
+		self._b_first_mask=int(b.outline_mask[0])
 
 	def lookup(self, strokes: Strokes)->Any:
-		if len(strokes)!=self.outline_length: return None
-		assert self.outline_mask
-		if any(a not in b for a, b in zip(strokes, self.outline_mask)): return None
+		parts=self._split_outline(strokes)
+		if parts is None: return None
 		a, b=self.a, self.b
-		assert a.outline_mask
-		assert b.outline_mask
-		if self.merge:
-			before=strokes[:len(a.outline_mask)-1]
-			common=strokes[len(a.outline_mask)-1]
-			after=strokes[len(a.outline_mask):]
-			strokes_a=before+(common&a.outline_mask[-1],)
-			strokes_b=(common&b.outline_mask[0],)+after
-		else:
-			strokes_a=strokes[:len(a.outline_mask)]
-			strokes_b=strokes[len(a.outline_mask):]
+		strokes_a, strokes_b=parts
 
 		value_a=a.lookup(strokes_a)
 		if value_a is None: return None
@@ -410,40 +1255,302 @@ class ProductDictionary(Dictionary):
 
 		return self.merge_value(value_a, value_b)
 
-	def merge_stroke(self, strokes_a: Strokes, strokes_b: Strokes)->Strokes:
-		if self.merge:
-			assert (strokes_a[-1]+strokes_b[0])==(strokes_a[-1]|strokes_b[0])
-			return strokes_a[:-1]+(strokes_a[-1]+strokes_b[0],)+strokes_b[1:]
+	def lookup_batch(self, outlines: Sequence[Strokes], checked: bool=False)->List[Any]:
+		results: List[Any]=[None]*len(outlines)
+		indices: List[int]=[]
+		parts_a: List[Strokes]=[]
+		parts_b: List[Strokes]=[]
+		stroke_type, split, a_last_mask, b_first_mask=self.stroke_type, self._split, self._a_last_mask, self._b_first_mask
+		for i, strokes in enumerate(outlines):
+			if not checked:
+				parts=self._split_outline(strokes)
+				if parts is None: continue
+				strokes_a, strokes_b=parts
+			elif self.merge:
+				common=int(strokes[split-1])
+				strokes_a=strokes[:split-1]+(int.__new__(stroke_type, common&a_last_mask),)
+				strokes_b=(int.__new__(stroke_type, common&b_first_mask),)+strokes[split:]
+			else:
+				strokes_a, strokes_b=strokes[:split], strokes[split:]
+			indices.append(i)
+			parts_a.append(strokes_a)
+			parts_b.append(strokes_b)
+		# the parts are within the masks of the operands, because the outlines are within the mask of the product
+		values_a=self.a.lookup_batch(parts_a, checked=True)
+		found=[j for j, value_a in enumerate(values_a) if value_a is not None]
+		values_b=self.b.lookup_batch([parts_b[j] for j in found], checked=True)
+		for j, value_b in zip(found, values_b):
+			if value_b is not None:
+				results[indices[j]]=self.merge_value(values_a[j], value_b)
+		return results
+
+	def children(self)->List[Dictionary]:
+		return [self.a, self.b]
+
+	def _split_outline(self, strokes: Strokes)->Optional[Tuple[Strokes, Strokes]]:
+		"""
+		Split an outline into the parts looked up in the two operands, or return None if it cannot be in the dictionary.
+		"""
+		if len(strokes)!=self.outline_length: return None
+		for stroke, inverse_mask in zip(strokes, self._inverse_masks):
+			if int(stroke)&inverse_mask: return None
+		split=self._split
+		if self.merge:
+			common=int(strokes[split-1])
+			return (
+					strokes[:split-1]+(int.__new__(self.stroke_type, common&self._a_last_mask),),
+					(int.__new__(self.stroke_type, common&self._b_first_mask),)+strokes[split:]
+					)
+		else:
+			return strokes[:split], strokes[split:]
+
+	def items_from(self, outline: Strokes)->Iterable[Tuple[Strokes, Any]]:
+		parts=self._split_outline(outline)
+		if parts is None: return
+		left_items=iter(self.a.items_from(parts[0]))
+		for strokes_a, value_a in itertools.islice(left_items, 1):
+			for strokes_b, value_b in self.b.items_from(parts[1]):
+				value=self.merge_value(value_a, value_b)
+				if value is not None:
+					yield self.merge_stroke(strokes_a, strokes_b), value
+		yield from self._items_from(left_items)
+
+	def count(self)->int:
+		if self.group_names or (self.a._values_not_callable() and self.b._values_not_callable()):
+			return self.a.count()*self.b.count()
+		return super().count()
+
+	def _values_not_callable(self)->bool:
+		return bool(self.group_names) or (self.a._values_not_callable() and self.b._values_not_callable())
+
+	def merge_stroke(self, strokes_a: Strokes, strokes_b: Strokes)->Strokes:
+		if self.merge:
+			# the masks of the operands do not overlap, checked in the constructor
+			return strokes_a[:-1]+(int.__new__(self.stroke_type, int(strokes_a[-1])|int(strokes_b[0])),)+strokes_b[1:]
 		else:
 			return strokes_a+strokes_b
 
 	def merge_value(self, value_a: Any, value_b: Any)->Any:
-		# return CompoundResult if either argument is CompoundResult (lookup result of a named dictionary)
-		# might also return None (nothing)
-		if isinstance(value_a, CompoundResult) or isinstance(value_b, CompoundResult):
-			result=CompoundResult({})
-			if isinstance(value_a, CompoundResult): result.data.update(value_a.data)
-			if isinstance(value_b, CompoundResult): result.data.update(value_b.data)
-			# the non-CompoundResult part is silently dropped
-		else:
-			if callable(value_a) and not callable(value_b):
-				return value_a(value_b)
-			if callable(value_b) and not callable(value_a):
-				return value_b(value_a)
-			try:
-				return value_a+value_b
-			except TypeError:
-				raise TypeError(f"Unsupported result types -- Left result: {value_a!r}, right result: {value_b!r}")
-		return result
+		return merge_values(value_a, value_b, self.group_layout)
 
 	def items(self)->Iterable[Tuple[Strokes, Any]]:
-		for strokes_a, value_a in self.a.items():
-			for strokes_b, value_b in self.b.items():
+		return self._items_from(self.a.items())
+
+	def item_partitions(self, count: int)->List[Callable[[], Iterable[Tuple[Strokes, Any]]]]:
+		# split the left operand if possible, otherwise split by consecutive ranges of the items of the left operand
+		left_parts=self.a.item_partitions(count)
+		if len(left_parts)>1:
+			return [functools.partial(lambda part: self._items_from(part()), part) for part in left_parts]
+		num_left_items=sum(1 for _ in self.a.items())
+		step=max(1, -(-num_left_items//count))
+		return [functools.partial(lambda start: self._items_from(itertools.islice(self.a.items(), start, start+step)), start)
+				for start in range(0, num_left_items, step)]
+
+	def _items_from(self, left_items: Iterable[Tuple[Strokes, Any]])->Iterable[Tuple[Strokes, Any]]:
+		for strokes_a, value_a, right_items in paired_items(left_items, self.b, self.items_cache_limit):
+			for strokes_b, value_b in right_items:
 				value=self.merge_value(value_a, value_b)
 				if value is not None:
 					yield self.merge_stroke(strokes_a, strokes_b), value
 
 
+class ChainProductDictionary(Dictionary):
+	"""
+	Equivalent to the left-nested chain of products `((factors[0] * factors[1]) * factors[2]) * ...`
+	(each `*` is `/` where `merges` is False), evaluated by a single node. See `Dictionary.optimize`.
+	"""
+	items_cache_limit: Optional[int]=None
+	"""
+	Same as `ProductDictionary.items_cache_limit`, for the items of each factor except the first one.
+	"""
+
+	def __init__(self, stroke_type: type, factors: List[Dictionary], merges: List[bool])->None:
+		super().__init__(stroke_type)
+		assert len(factors)>=2 and len(merges)==len(factors)-1
+		self.factors=factors
+		self.merges=merges
+		# the attributes of the left-nested products factors[0] * ... * factors[i]
+		self._prefix_group_names: List[Optional[FrozenSet[str]]]=[factors[0].group_names]
+		self._prefix_layouts: List[Optional[Tuple[str, ...]]]=[factors[0].group_layout]
+		outline_mask=factors[0].outline_mask
+		for factor, merge in zip(factors[1:], merges):
+			assert factor.outline_length and factor.outline_mask
+			group_names=self._prefix_group_names[-1]
+			group_layout=self._prefix_layouts[-1]
+			if group_names is not None and factor.group_names is not None:
+				duplicate_names=group_names&factor.group_names
+				assert not duplicate_names, f"Duplicate group names in product: {sorted(duplicate_names)}"
+			self._prefix_group_names.append(None if group_names is None or factor.group_names is None else group_names|factor.group_names)
+			self._prefix_layouts.append(None if group_layout is None or factor.group_layout is None else group_layout+factor.group_layout)
+			if merge:
+				x=outline_mask[-1]
+				y=factor.outline_mask[0]
+				assert not (x&y), f"Cannot merge -- overlapping mask: {x} & {y}"
+				outline_mask=outline_mask[:-1]+(x|y,)+factor.outline_mask[1:]
+			else:
+				outline_mask=outline_mask+factor.outline_mask
+		self.outline_mask=outline_mask
+		self.outline_length=len(outline_mask)
+		self.longest_key=self.outline_length
+		self.group_names=self._prefix_group_names[-1]
+		self.group_layout=self._prefix_layouts[-1]
+		self._inverse_masks=tuple(~int(mask) for mask in outline_mask)
+		# all values are CompoundResult, so merging them is a concatenation
+		self._concatenate=bool(self.group_layout) and all(factor.group_layout for factor in factors)
+
+		# for each factor: the slice of the outline, and the masks of its first and last stroke
+		# (-1 unless the stroke is shared with a neighbor), or None if no stroke is shared
+		self._slices: List[Tuple[Dictionary, int, int, Optional[Tuple[int, int]]]]=[]
+		start=0
+		for i, factor in enumerate(factors):
+			merge_before=i>0 and merges[i-1]
+			merge_after=i<len(merges) and merges[i]
+			masks=None
+			if merge_before or merge_after:
+				masks=(int(factor.outline_mask[0]) if merge_before else -1, int(factor.outline_mask[-1]) if merge_after else -1)
+			self._slices.append((factor, start, start+factor.outline_length, masks))
+			start+=factor.outline_length-merge_after
+
+	def children(self)->List[Dictionary]:
+		return list(self.factors)
+
+	def _split_outline(self, strokes: Strokes, checked: bool=False)->Optional[List[Strokes]]:
+		"""
+		Split an outline into the parts looked up in the factors, or return None if it cannot be in the dictionary.
+		"""
+		if not checked:
+			if len(strokes)!=self.outline_length: return None
+			for stroke, inverse_mask in zip(strokes, self._inverse_masks):
+				if int(stroke)&inverse_mask: return None
+		stroke_type=self.stroke_type
+		parts=[]
+		for factor, start, end, masks in self._slices:
+			if masks is None:
+				parts.append(strokes[start:end])
+			elif end-start==1:
+				parts.append((int.__new__(stroke_type, int(strokes[start])&masks[0]&masks[1]),))
+			else:
+				parts.append((int.__new__(stroke_type, int(strokes[start])&masks[0]),)+strokes[start+1:end-1]
+						+(int.__new__(stroke_type, int(strokes[end-1])&masks[1]),))
+		return parts
+
+	def _merge_values(self, values: List[Any])->Any:
+		"""
+		Merge the values of the factors, like the left-nested products do.
+		"""
+		if self._concatenate and all(value._data is None for value in values):
+			return CompoundResult(names=self.group_layout, values=tuple(itertools.chain.from_iterable(value.values for value in values)))
+		value=values[0]
+		for value_b, group_layout in zip(values[1:], self._prefix_layouts[1:]):
+			value=merge_values(value, value_b, group_layout)
+			if value is None: return None
+		return value
+
+	def lookup(self, strokes: Strokes)->Any:
+		parts=self._split_outline(strokes)
+		if parts is None: return None
+		values=[]
+		for (factor, _start, _end, _masks), part in zip(self._slices, parts):
+			value=factor.lookup(part)
+			if value is None: return None
+			values.append(value)
+		return self._merge_values(values)
+
+	def lookup_batch(self, outlines: Sequence[Strokes], checked: bool=False)->List[Any]:
+		results: List[Any]=[None]*len(outlines)
+		indices: List[int]=[]
+		parts_list: List[List[Strokes]]=[]
+		for i, strokes in enumerate(outlines):
+			parts=self._split_outline(strokes, checked)
+			if parts is None: continue
+			indices.append(i)
+			parts_list.append(parts)
+		# each factor only looks up the outlines for which all the previous factors have a value
+		found=list(range(len(indices)))
+		values_list: List[List[Any]]=[[] for _ in indices]
+		for k, factor in enumerate(self.factors):
+			values=factor.lookup_batch([parts_list[j][k] for j in found], checked=True)
+			found_next=[]
+			for j, value in zip(found, values):
+				if value is not None:
+					values_list[j].append(value)
+					found_next.append(j)
+			found=found_next
+		for j in found:
+			results[indices[j]]=self._merge_values(values_list[j])
+		return results
+
+	def _merge_stroke(self, strokes_a: Strokes, strokes_b: Strokes, merge: bool)->Strokes:
+		if merge:
+			return strokes_a[:-1]+(int.__new__(self.stroke_type, int(strokes_a[-1])|int(strokes_b[0])),)+strokes_b[1:]
+		return strokes_a+strokes_b
+
+	def items(self)->Iterable[Tuple[Strokes, Any]]:
+		return self._items_from(self.factors[0].items())
+
+	def _items_from(self, first_items: Iterable[Tuple[Strokes, Any]])->Iterable[Tuple[Strokes, Any]]:
+		"""
+		Return the items of the product, given the items of the first factor.
+		"""
+		items=first_items
+		for i in range(1, len(self.factors)):
+			items=self._product_items(items, i)
+		return items
+
+	def _product_items(self, left_items: Iterable[Tuple[Strokes, Any]], i: int)->Iterable[Tuple[Strokes, Any]]:
+		"""
+		Return the items of `(factors[0] * ... * factors[i-1]) * factors[i]`, given the items of the left operand.
+		"""
+		merge, group_layout=self.merges[i-1], self._prefix_layouts[i]
+		for strokes_a, value_a, right_items in paired_items(left_items, self.factors[i], self.items_cache_limit):
+			for strokes_b, value_b in right_items:
+				value=merge_values(value_a, value_b, group_layout)
+				if value is not None:
+					yield self._merge_stroke(strokes_a, strokes_b, merge), value
+
+	def items_from(self, outline: Strokes)->Iterable[Tuple[Strokes, Any]]:
+		parts=self._split_outline(outline)
+		if parts is None: return ()
+		return self._prefix_items_from(parts, len(self.factors)-1)
+
+	def _prefix_items_from(self, parts: List[Strokes], i: int)->Iterable[Tuple[Strokes, Any]]:
+		"""
+		Same as `ProductDictionary.items_from` for `factors[0] * ... * factors[i]`.
+		"""
+		if i==0:
+			yield from self.factors[0].items_from(parts[0])
+			return
+		merge, group_layout=self.merges[i-1], self._prefix_layouts[i]
+		left_items=iter(self._prefix_items_from(parts, i-1))
+		for strokes_a, value_a in itertools.islice(left_items, 1):
+			for strokes_b, value_b in self.factors[i].items_from(parts[i]):
+				value=merge_values(value_a, value_b, group_layout)
+				if value is not None:
+					yield self._merge_stroke(strokes_a, strokes_b, merge), value
+		yield from self._product_items(left_items, i)
+
+	def item_partitions(self, count: int)->List[Callable[[], Iterable[Tuple[Strokes, Any]]]]:
+		# same as ProductDictionary: split the first factor
+		first=self.factors[0]
+		first_parts=first.item_partitions(count)
+		if len(first_parts)>1:
+			return [functools.partial(lambda part: self._items_from(part()), part) for part in first_parts]
+		num_first_items=sum(1 for _ in first.items())
+		step=max(1, -(-num_first_items//count))
+		return [functools.partial(lambda start: self._items_from(itertools.islice(first.items(), start, start+step)), start)
+				for start in range(0, num_first_items, step)]
+
+	def count(self)->int:
+		not_callable=self.factors[0]._values_not_callable()
+		for factor, group_names in zip(self.factors[1:], self._prefix_group_names[1:]):
+			not_callable=not_callable and factor._values_not_callable()
+			if not (group_names or not_callable): return super().count()
+		return functools.reduce(operator.mul, (factor.count() for factor in self.factors))
+
+	def _values_not_callable(self)->bool:
+		return bool(self.group_names) or all(factor._values_not_callable() for factor in self.factors)
+
+
 class SubsetDictionary(Dictionary):
 	"""
 	A dictionary formed as all the subsets of a particular set of keys (including the empty stroke).
@@ -451,20 +1558,31 @@ class SubsetDictionary(Dictionary):
 	"""
 	def __init__(self, stroke_type: type, keys: InputStrokeType)->None:
 		super().__init__(stroke_type)
+		self.group_names=frozenset()
+		self.group_layout=()
 		self.outline_mask=(to_stroke(stroke_type, keys),)
 		self.outline_length=1
 		self.longest_key=1
+		self._inverse_mask=~int(self.outline_mask[0])
 
 	def items(self)->Iterable[Tuple[Strokes, Any]]:
 		assert self.outline_mask is not None
-		for stroke in subsets(self.outline_mask[0]):
+		stroke_type=self.stroke_type
+		for mask in submasks(int(self.outline_mask[0])):
+			stroke=int.__new__(stroke_type, mask)
 			yield (stroke,), stroke
 
 	def lookup(self, strokes: Strokes)->Any:
-		assert self.outline_mask is not None
-		if len(strokes)==1 and strokes[0] in self.outline_mask[0]:
+		if len(strokes)==1 and not int(strokes[0])&self._inverse_mask:
 			return strokes[0]
 
+	def count(self)->int:
+		assert self.outline_mask is not None
+		return 1<<bin(int(self.outline_mask[0])).count("1")
+
+	def _values_not_callable(self)->bool:
+		return True
+
 
 class AlternativeDictionary(Dictionary):
 	"""
@@ -481,6 +1599,11 @@ class AlternativeDictionary(Dictionary):
 
 		assert self._components
 
+		group_names=self._components[0].group_names
+		self.group_names=group_names if all(component.group_names==group_names for component in self._components) else None
+		group_layout=self._components[0].group_layout
+		self.group_layout=group_layout if all(component.group_layout==group_layout for component in self._components) else None
+
 		self.longest_key=max(component.longest_key for component in self._components)
 
 		if any(component.outline_length is None
@@ -495,15 +1618,1326 @@ class AlternativeDictionary(Dictionary):
 					(component.outline_mask for component in self._components)
 					)
 
+	@functools.cached_property
+	def _lookup_components(self)->List[Union[Dictionary, "_ComponentIndex"]]:
+		"""
+		The components used for lookups: same as `_components`, except that each run of adjacent
+		`SingleDictionary` components is replaced by a `_ComponentIndex`, which finds the component to look up
+		with a single hash table probe.
+		"""
+		result: List[Union[Dictionary, _ComponentIndex]]=[]
+		run: List[SingleDictionary]=[]
+		def flush()->None:
+			if len(run)==1:
+				result.append(run[0])
+			elif run:
+				result.append(_ComponentIndex(list(run)))
+			run.clear()
+		for component in self._components:
+			if isinstance(component, SingleDictionary) and isinstance(component.data, dict):
+				run.append(component)
+			else:
+				flush()
+				result.append(component)
+		flush()
+		return result
+
+	@functools.cached_property
+	def _dispatch(self)->Dict[int, List[Tuple[Union[Dictionary, "_ComponentIndex"], int]]]:
+		"""
+		For each outline length, the lookup components that may have an outline of that length (in priority order),
+		together with the union mask of the first stroke of those outlines (-1 if unknown).
+
+		Computed on first use, so that the intermediate dictionaries of `a | b | c | ...` do not compute it.
+		"""
+		result: Dict[int, List[Tuple[Union[Dictionary, _ComponentIndex], int]]]={}
+		for component in self._lookup_components:
+			outline_masks=component.outline_masks()
+			if outline_masks is None:
+				outline_masks={length: (-1,)*length for length in range(component.longest_key+1)}
+			for length, masks in outline_masks.items():
+				result.setdefault(length, []).append((component, masks[0] if masks else -1))
+		return result
+
+	def _compute_outline_masks(self)->Optional[Dict[int, Tuple[int, ...]]]:
+		return union_outline_masks(self._components)
+
+	def children(self)->List[Dictionary]:
+		return list(self._components)
+
 	def items(self)->Iterable[Tuple[Strokes, Any]]:
 		for component in self._components:
 			yield from component.items()
 
+	def items_with_source(self)->Iterable[Tuple[Strokes, Any, Tuple[str, ...]]]:
+		for i, component in enumerate(self._components):
+			label=f"[{i}]"
+			for strokes, value, source in component.items_with_source():
+				yield strokes, value, (label,)+source
+
+	def item_partitions(self, count: int)->List[Callable[[], Iterable[Tuple[Strokes, Any]]]]:
+		return [part for component in self._components for part in component.item_partitions(max(1, count//len(self._components)))]
+
+	def items_from(self, outline: Strokes)->Iterable[Tuple[Strokes, Any]]:
+		for i, component in enumerate(self._components):
+			if component.lookup(outline) is not None:
+				yield from component.items_from(outline)
+				for component in self._components[i+1:]:
+					yield from component.items()
+				return
+
+	def count(self)->int:
+		return sum(component.count() for component in self._components)
+
+	def _values_not_callable(self)->bool:
+		return all(component._values_not_callable() for component in self._components)
+
 	def lookup(self, strokes: Strokes)->Any:
-		for component in self._components:
+		candidates=self._dispatch.get(len(strokes))
+		if candidates is None: return None
+		first=int(strokes[0]) if strokes else 0
+		for component, mask in candidates:
+			if first&~mask: continue
 			result=component.lookup(strokes)
 			if result is not None: return result
 
+	def lookup_batch(self, outlines: Sequence[Strokes], checked: bool=False)->List[Any]:
+		results: List[Any]=[None]*len(outlines)
+		by_length: Dict[int, List[int]]={}
+		for i, strokes in enumerate(outlines):
+			by_length.setdefault(len(strokes), []).append(i)
+		for length, pending in by_length.items():
+			firsts={i: int(outlines[i][0]) if length else 0 for i in pending}
+			for component, mask in self._dispatch.get(length, ()):
+				batch=[i for i in pending if not firsts[i]&~mask]
+				if not batch: continue
+				found=False
+				for i, result in zip(batch, component.lookup_batch([outlines[i] for i in batch])):
+					if result is not None:
+						results[i]=result
+						found=True
+				if found:
+					pending=[i for i in pending if results[i] is None]
+					if not pending: break
+		return results
+
+
+class _ComponentIndex:
+	"""
+	Look up a run of `SingleDictionary` components of an `AlternativeDictionary` as a whole:
+	each outline is mapped to the first component that has it, and looked up in that component
+	(so the components' own `lookup`, possibly instrumented, is still called).
+	"""
+	def __init__(self, components: List[SingleDictionary])->None:
+		self.components=components
+		self.longest_key=max(component.longest_key for component in components)
+		self._index: Dict[Strokes, SingleDictionary]={}
+		for component in reversed(components):
+			self._index.update(dict.fromkeys(component.data, component))
+
+	def outline_masks(self)->Optional[Dict[int, Tuple[int, ...]]]:
+		return union_outline_masks(self.components)
+
+	def lookup(self, strokes: Strokes)->Any:
+		component=self._index.get(strokes)
+		if component is None: return None
+		return component.lookup(strokes)
+
+	def lookup_batch(self, outlines: Sequence[Strokes], checked: bool=False)->List[Any]:
+		results: List[Any]=[None]*len(outlines)
+		by_component: Dict[int, Tuple[SingleDictionary, List[int]]]={}
+		index=self._index
+		for i, strokes in enumerate(outlines):
+			component=index.get(strokes)
+			if component is not None:
+				by_component.setdefault(id(component), (component, []))[1].append(i)
+		for component, indices in by_component.values():
+			for i, result in zip(indices, component.lookup_batch([outlines[i] for i in indices])):
+				results[i]=result
+		return results
+
+
+class CompiledDictionary(Dictionary):
+	"""
+	A frozen dictionary holding the precomputed content of another dictionary.
+	See `Dictionary.compiled`.
+	"""
+	def __init__(self, stroke_type: type, source: Dictionary)->None:
+		super().__init__(stroke_type)
+		self.data: Dict[Strokes, Any]={}
+		for strokes, value in source.items():
+			self.data.setdefault(strokes, value)
+		self.longest_key=source.longest_key
+		self.outline_length=source.outline_length
+		self.outline_mask=source.outline_mask
+		self.group_names=source.group_names
+		self.group_layout=source.group_layout
+
+	def lookup(self, strokes: Strokes)->Any:
+		return self.data.get(strokes)
+
+	def items(self)->Iterable[Tuple[Strokes, Any]]:
+		return self.data.items()
+
+	def keys(self)->Iterable[Strokes]:
+		return self.data.keys()
+
+	def __contains__(self, strokes: Strokes)->bool:
+		return self.data.__contains__(strokes)
+
+	def __len__(self)->int:
+		return len(self.data)
+
+	def count(self)->int:
+		return len(self.data)
+
+	def _compute_outline_masks(self)->Optional[Dict[int, Tuple[int, ...]]]:
+		return outline_masks_of(self.data.keys())
+
+
+class CachedDictionary(Dictionary):
+	"""
+	A dictionary that remembers the lookup results of another dictionary, with least-recently-used eviction.
+	See `Dictionary.cached`.
+
+	`lookup_tuple` results are remembered by the raw stroke strings,
+	so that repeated lookups do not need to parse the strokes again.
+	"""
+	def __init__(self, stroke_type: type, wrapped: Dictionary, maxsize: Optional[int])->None:
+		super().__init__(stroke_type)
+		assert maxsize is None or maxsize>0, maxsize
+		self.wrapped=wrapped
+		self.maxsize=maxsize
+		self.longest_key=wrapped.longest_key
+		self.outline_length=wrapped.outline_length
+		self.outline_mask=wrapped.outline_mask
+		self.group_names=wrapped.group_names
+		self.group_layout=wrapped.group_layout
+		self.hits: int=0
+		self.misses: int=0
+		from collections import OrderedDict
+		# keys are either Strokes or tuple of str, which never compare equal
+		self._cache: "OrderedDict[Tuple[Any, ...], Any]"=OrderedDict()
+
+	def _store(self, key: Tuple[Any, ...], value: Any)->None:
+		self._cache[key]=value
+		if self.maxsize is not None and len(self._cache)>self.maxsize:
+			self._cache.popitem(last=False)
+
+	def lookup(self, strokes: Strokes)->Any:
+		cache=self._cache
+		if strokes in cache:
+			self.hits+=1
+			cache.move_to_end(strokes)
+			return cache[strokes]
+		self.misses+=1
+		result=self.wrapped.lookup(strokes)
+		self._store(strokes, result)
+		return result
+
+	def lookup_tuple(self, strokes: Sequence[str])->LookupResult:
+		key=tuple(strokes)
+		cache=self._cache
+		if key in cache:
+			self.hits+=1
+			cache.move_to_end(key)
+			return cache[key]
+		self.misses+=1
+		try:
+			strokes_=tuple(map(stroke_cache(self.stroke_type).parse, key))
+		except ValueError:
+			raise KeyError(strokes)
+		result=self.wrapped.lookup(strokes_) if self.wrapped.could_match(strokes_) else None
+		assert result is None or isinstance(result, str), result
+		self._store(key, result)
+		return result
+
+	def invalidate(self)->None:
+		"""
+		Forget all remembered lookup results. The hit/miss counters are kept.
+		"""
+		self._cache.clear()
+
+	def children(self)->List[Dictionary]:
+		return [self.wrapped]
+
+	def items(self)->Iterable[Tuple[Strokes, Any]]:
+		return self.wrapped.items()
+
+	def items_from(self, outline: Strokes)->Iterable[Tuple[Strokes, Any]]:
+		return self.wrapped.items_from(outline)
+
+	def items_with_source(self)->Iterable[Tuple[Strokes, Any, Tuple[str, ...]]]:
+		return self.wrapped.items_with_source()
+
+	def _compute_outline_masks(self)->Optional[Dict[int, Tuple[int, ...]]]:
+		return self.wrapped.outline_masks()
+
+	def count(self)->int:
+		return self.wrapped.count()
+
+	def _values_not_callable(self)->bool:
+		return self.wrapped._values_not_callable()
+
+
+def _optimize_node(node: Dictionary, memo: Dict[int, Dictionary])->Dictionary:
+	"""
+	Implementation of `Dictionary.optimize`. `memo` maps the id of the nodes already optimized to the result,
+	so that shared nodes stay shared.
+	"""
+	if id(node) in memo: return memo[id(node)]
+	stroke_type=node.stroke_type
+	result: Dictionary=node
+
+	if isinstance(node, NamedDictionary):
+		wrapped=_optimize_node(node.wrapped, memo)
+		if wrapped is not node.wrapped: result=NamedDictionary(stroke_type, wrapped, node.name)
+
+	elif isinstance(node, CachedDictionary):
+		wrapped=_optimize_node(node.wrapped, memo)
+		if wrapped is not node.wrapped: result=CachedDictionary(stroke_type, wrapped, node.maxsize)
+
+	elif type(node) in (RawMappedDictionary, MappedDictionary, FilteredDictionary):
+		assert isinstance(node, RawMappedDictionary)
+		wrapped=_optimize_node(node.wrapped, memo)
+		pushed=_push_down_filter(node, wrapped, memo) if isinstance(node, FilteredDictionary) else None
+		if pushed is not None:
+			result=pushed
+		elif type(wrapped) in (RawMappedDictionary, MappedDictionary, FilteredDictionary):
+			assert isinstance(wrapped, RawMappedDictionary)
+			inner, outer=wrapped.raw_mapped_function, node.raw_mapped_function
+			def fused(strokes: Strokes, result: Any)->Any:
+				value=inner(strokes, result)
+				if value is None: return None
+				return outer(strokes, value)
+			result=RawMappedDictionary(stroke_type, wrapped.wrapped, fused)
+			result.group_names, result.group_layout=node.group_names, node.group_layout
+		elif wrapped is not node.wrapped:
+			if isinstance(node, MappedDictionary):
+				result=MappedDictionary(stroke_type, wrapped, node.mapped_function)
+			elif isinstance(node, FilteredDictionary):
+				result=FilteredDictionary(stroke_type, wrapped, node.condition)
+			else:
+				result=RawMappedDictionary(stroke_type, wrapped, node.raw_mapped_function)
+				result.group_names, result.group_layout=node.group_names, node.group_layout
+
+	elif isinstance(node, ProductDictionary):
+		a=_optimize_node(node.a, memo)
+		b=_optimize_node(node.b, memo)
+		factors, merges=_product_factors(a)
+		right_factors, right_merges=_product_factors(b)
+		# a*(b*c) is the same as (a*b)*c if no value is callable, because merging the values is then associative
+		if len(right_factors)>1 and all(factor._values_not_callable() for factor in factors+right_factors):
+			factors, merges=factors+right_factors, merges+[node.merge]+right_merges
+		else:
+			factors, merges=factors+[b], merges+[node.merge]
+		if len(factors)>2:
+			result=ChainProductDictionary(stroke_type, factors, merges)
+			if node.items_cache_limit is not None: result.items_cache_limit=node.items_cache_limit
+		elif a is not node.a or b is not node.b:
+			result=ProductDictionary(stroke_type, a, b, node.merge)
+
+	elif isinstance(node, ChainProductDictionary):
+		factors=[_optimize_node(factor, memo) for factor in node.factors]
+		if any(factor is not original for factor, original in zip(factors, node.factors)):
+			result=ChainProductDictionary(stroke_type, factors, node.merges)
+
+	elif isinstance(node, AlternativeDictionary):
+		components: List[Dictionary]=[]
+		for component in map(lambda component: _optimize_node(component, memo), node.children()):
+			previous=components[-1] if components else None
+			if (isinstance(previous, SingleDictionary) and isinstance(component, SingleDictionary)
+					and isinstance(previous.data, dict) and isinstance(component.data, dict)
+					and previous.data.keys().isdisjoint(component.data.keys())):
+				# the merged items are in the same order, and lookup finds the same (only) value
+				components[-1]=SingleDictionary(stroke_type, {**previous.data, **component.data})
+			else:
+				components.append(component)
+		if len(components)==1:
+			result=components[0]
+		elif any(component is not original for component, original in zip(components, node.children())) or len(components)!=len(node.children()):
+			result=AlternativeDictionary(stroke_type, components)
+
+	memo[id(node)]=result
+	return result
+
+
+def _product_factors(node: Dictionary)->Tuple[List[Dictionary], List[bool]]:
+	"""
+	Return the factors and the merges of `node` seen as a left-nested chain of products (a single factor if it's not a product).
+	"""
+	if isinstance(node, ChainProductDictionary):
+		return [*node.factors], [*node.merges]
+	if isinstance(node, ProductDictionary):
+		return [node.a, node.b], [node.merge]
+	return [node], []
+
+
+def _push_down_filter(node: "FilteredDictionary", wrapped: Dictionary, memo: Dict[int, Dictionary])->Optional[Dictionary]:
+	"""
+	If the condition of `node` only reads the groups of one factor of the product `wrapped`,
+	return the product with the condition applied on that factor instead. Otherwise return None.
+	"""
+	if isinstance(wrapped, ProductDictionary):
+		factors=[wrapped.a, wrapped.b]
+	elif isinstance(wrapped, ChainProductDictionary):
+		factors=wrapped.factors
+	else:
+		return None
+	condition=node.condition
+	used=function_used_arguments(condition)
+	if not used or "strokes" in used: return None
+	for i, factor in enumerate(factors):
+		if factor.group_names and used<=factor.group_names: break
+	else:
+		return None
+	arg_names=function_signature(condition).arg_names
+	assert arg_names is not None
+	# the other arguments are not read, so any value does
+	unused_arguments=dict.fromkeys(arg_names-factor.group_names)
+	@functools.wraps(condition)
+	def restricted_condition(strokes: Strokes, **groups: Any)->Any:
+		return condition(**groups, **unused_arguments)
+	factors=[*factors]
+	factors[i]=_optimize_node(FilteredDictionary(node.stroke_type, factor, restricted_condition), memo)
+	if isinstance(wrapped, ProductDictionary):
+		return ProductDictionary(node.stroke_type, factors[0], factors[1], wrapped.merge)
+	return ChainProductDictionary(node.stroke_type, factors, wrapped.merges)
+
+
+@dataclass
+class ConflictReport:
+	"""
+	The result of `Dictionary.analyze_conflicts`. Outlines are RTF/CRE strings,
+	sources are the paths of `items_with_source` joined with spaces.
+	"""
+	items: int=0
+	outlines: int=0  # number of distinct outlines
+	sources: List[str]=field(default_factory=list)
+	duplicates: Dict[str, List[Tuple[str, Any]]]=field(default_factory=dict)  # outline -> all (source, value) in order
+	collisions: Dict[Tuple[str, str], int]=field(default_factory=dict)  # (source of the kept item, source of the dropped item) -> count
+	external: Dict[str, Tuple[str, Any, Any]]=field(default_factory=dict)  # outline -> (source, value, external value)
+
+	def report(self, limit: int=10)->str:
+		"""
+		Return a human-readable summary, with at most `limit` examples per section.
+		"""
+		lines=[f"{self.items} items, {self.outlines} distinct outlines, {len(self.duplicates)} duplicated outlines"]
+		for (kept, dropped), count in sorted(self.collisions.items(), key=lambda item: -item[1]):
+			lines.append(f"  {dropped} is shadowed by {kept}: {count} outlines")
+		for outline, entries in list(self.duplicates.items())[:limit]:
+			lines.append(f"  {outline}: "+", ".join(f"{value!r} ({source})" for source, value in entries))
+		if self.external:
+			differing=[(outline, entry) for outline, entry in self.external.items() if entry[1]!=entry[2]]
+			lines.append(f"{len(self.external)} outlines also in the external dictionary, {len(differing)} with a different value")
+			for outline, (source, value, external_value) in differing[:limit]:
+				lines.append(f"  {outline}: {value!r} ({source}), external {external_value!r}")
+		return "\n".join(lines)
+
+
+@dataclass
+class NodeStatistics:
+	"""
+	Statistics of a single dictionary node recorded by `Instrumentation`. Times are in seconds.
+	"""
+	lookup_calls: int=0
+	lookup_hits: int=0
+	lookup_time: float=0.
+	lookup_self_time: float=0.
+	items_calls: int=0
+	items_yielded: int=0
+	items_time: float=0.
+	items_self_time: float=0.
+	function_calls: int=0  # calls of the user function of a MappedDictionary or FilteredDictionary
+	function_time: float=0.
+
+
+def node_label(dictionary: Dictionary)->str:
+	"""
+	Return a short human-readable description of a dictionary node.
+	"""
+	label=dictionary.__class__.__name__
+	if isinstance(dictionary, NamedDictionary):
+		return f"{label}({dictionary.name!r})"
+	if isinstance(dictionary, MappedDictionary):
+		return f"{label}({getattr(dictionary.mapped_function, '__qualname__', dictionary.mapped_function)})"
+	if isinstance(dictionary, FilteredDictionary):
+		return f"{label}({getattr(dictionary.condition, '__qualname__', dictionary.condition)})"
+	if isinstance(dictionary, ProductDictionary):
+		return f"{label}({'*' if dictionary.merge else '/'})"
+	if isinstance(dictionary, ChainProductDictionary):
+		return f"{label}({''.join('*' if merge else '/' for merge in dictionary.merges)})"
+	return label
+
+
+class Instrumentation:
+	"""
+	Record call counts, cumulative and self time and hit ratios of `lookup` and `items` of every node
+	of a dictionary. See `Dictionary.instrumented`. Each outline of a `lookup_batch` call counts as a lookup call.
+
+	While active, the methods are replaced by timed wrappers set as instance attributes;
+	those are removed on exit. The statistics accumulate if the context manager is entered again.
+	"""
+	def __init__(self, root: Dictionary)->None:
+		self.root=root
+		self.statistics: Dict[int, NodeStatistics]={}  # by id of the node
+		self._nodes: List[Dictionary]=[]
+		self._original_functions: Dict[int, Callable[[Strokes, Any], Any]]={}
+		self._child_time: List[float]=[]  # stack of the time spent in instrumented callees of the running calls
+
+	def _timed(self, function: Callable[[], Any])->Tuple[Any, float, float]:
+		"""
+		Run `function`, return its result, its running time and its running time excluding instrumented callees.
+		"""
+		self._child_time.append(0.)
+		start=time.perf_counter()
+		try:
+			result=function()
+		finally:
+			elapsed=time.perf_counter()-start
+			child_time=self._child_time.pop()
+			if self._child_time: self._child_time[-1]+=elapsed
+		return result, elapsed, elapsed-child_time
+
+	def _instrument(self, node: Dictionary)->None:
+		statistics=self.statistics.setdefault(id(node), NodeStatistics())
+		original_lookup=node.lookup
+		original_lookup_batch=node.lookup_batch
+		original_items=node.items
+
+		def lookup(strokes: Strokes)->Any:
+			result, elapsed, self_elapsed=self._timed(lambda: original_lookup(strokes))
+			statistics.lookup_calls+=1
+			statistics.lookup_hits+=result is not None
+			statistics.lookup_time+=elapsed
+			statistics.lookup_self_time+=self_elapsed
+			return result
+
+		def lookup_batch(outlines: Sequence[Strokes], checked: bool=False)->List[Any]:
+			results, elapsed, self_elapsed=self._timed(lambda: original_lookup_batch(outlines, checked))
+			statistics.lookup_calls+=len(outlines)
+			statistics.lookup_hits+=sum(result is not None for result in results)
+			statistics.lookup_time+=elapsed
+			statistics.lookup_self_time+=self_elapsed
+			return results
+
+		def items()->Iterable[Tuple[Strokes, Any]]:
+			statistics.items_calls+=1
+			iterator, elapsed, self_elapsed=self._timed(lambda: iter(original_items()))
+			statistics.items_time+=elapsed
+			statistics.items_self_time+=self_elapsed
+			sentinel=object()
+			while True:
+				item, elapsed, self_elapsed=self._timed(lambda: next(iterator, sentinel))
+				statistics.items_time+=elapsed
+				statistics.items_self_time+=self_elapsed
+				if item is sentinel: return
+				statistics.items_yielded+=1
+				yield item
+
+		node.lookup=lookup  # type: ignore
+		node.lookup_batch=lookup_batch  # type: ignore
+		node.items=items  # type: ignore
+
+		if isinstance(node, (MappedDictionary, FilteredDictionary)):
+			original_function=self._original_functions[id(node)]=node.raw_mapped_function
+			def function(strokes: Strokes, result: Any)->Any:
+				start=time.perf_counter()
+				try:
+					return original_function(strokes, result)
+				finally:
+					statistics.function_calls+=1
+					statistics.function_time+=time.perf_counter()-start
+			node.raw_mapped_function=function
+
+	def __enter__(self)->"Instrumentation":
+		assert not self._nodes, "Instrumentation is already active"
+		visited: set=set()
+		pending=[self.root]
+		while pending:
+			node=pending.pop()
+			if id(node) in visited: continue
+			visited.add(id(node))
+			assert "lookup" not in node.__dict__, f"{node_label(node)} is already instrumented"
+			self._instrument(node)
+			self._nodes.append(node)
+			pending.extend(node.children())
+		return self
+
+	def __exit__(self, *args: Any)->None:
+		for node in self._nodes:
+			del node.lookup  # type: ignore
+			del node.lookup_batch  # type: ignore
+			del node.items  # type: ignore
+			if id(node) in self._original_functions:
+				node.raw_mapped_function=self._original_functions[id(node)]  # type: ignore
+		self._nodes=[]
+		self._original_functions={}
+
+	def report(self)->str:
+		"""
+		Return the recorded statistics as an indented tree, with times in milliseconds.
+		"""
+		lines: List[str]=[]
+		seen: set=set()
+		def visit(node: Dictionary, depth: int)->None:
+			statistics=self.statistics.get(id(node), NodeStatistics())
+			line="  "*depth+node_label(node)
+			if id(node) in seen:
+				lines.append(line+" (shared, see above)")
+				return
+			seen.add(id(node))
+			line+=(f": lookup {statistics.lookup_calls} calls, {statistics.lookup_hits} hits, "
+					f"{statistics.lookup_time*1000:.3f} ms (self {statistics.lookup_self_time*1000:.3f} ms); "
+					f"items {statistics.items_calls} calls, {statistics.items_yielded} yielded, "
+					f"{statistics.items_time*1000:.3f} ms (self {statistics.items_self_time*1000:.3f} ms)")
+			if statistics.function_calls:
+				line+=f"; function {statistics.function_calls} calls, {statistics.function_time*1000:.3f} ms"
+			lines.append(line)
+			for child in node.children():
+				visit(child, depth+1)
+		visit(self.root, 0)
+		return "\n".join(lines)
+
+
+def structural_key(node: Dictionary, memo: Optional[Dict[int, Any]]=None)->Any:
+	"""
+	Return a hashable key such that dictionaries with equal keys have the same content.
+
+	The user functions are compared by identity, and nodes that are not understood are only equal to themselves.
+	"""
+	if memo is None: memo={}
+	if id(node) in memo: return memo[id(node)]
+	key: Any=("id", id(node))
+	children=[structural_key(child, memo) for child in node.children()]
+	if type(node) is SingleDictionary and isinstance(node.data, dict):
+		try:
+			# values that are equal but of different types (1 and 1.0) may give different results
+			key=("single", tuple((strokes, type(value), value) for strokes, value in node.data.items()))
+			hash(key)
+		except TypeError:
+			key=("id", id(node))
+	elif type(node) is SubsetDictionary:
+		key=("subset", int(node.outline_mask[0]))  # type: ignore
+	elif type(node) is NamedDictionary:
+		key=("named", node.name, *children)
+	elif type(node) is MappedDictionary:
+		key=("map", node.mapped_function, *children)
+	elif type(node) is FilteredDictionary:
+		key=("filter", node.condition, *children)
+	elif type(node) is RawMappedDictionary:
+		key=("raw", node.raw_mapped_function, *children)
+	elif type(node) is CachedDictionary:
+		key=children[0]
+	elif type(node) is ProductDictionary:
+		key=("product", node.merge, *children)
+	elif type(node) is ChainProductDictionary:
+		key=("chain", tuple(node.merges), *children)
+	elif type(node) is AlternativeDictionary:
+		key=("alternative", *children)
+	memo[id(node)]=key
+	return key
+
+
+_INCREMENTAL_FORMAT=1  # version of the state file of `Dictionary.write_json_incremental`
+
+_file_hashes: Dict[Tuple[str, int, int], str]={}
+
+def _file_hash(path: str)->str:
+	"""
+	Return the SHA-256 of the content of a file, cached while its size and modification time do not change.
+	"""
+	import hashlib
+	import os
+	stat=os.stat(path)
+	key=(path, stat.st_mtime_ns, stat.st_size)
+	result=_file_hashes.get(key)
+	if result is None:
+		with open(path, "rb") as f:
+			result=_file_hashes[key]=hashlib.sha256(f.read()).hexdigest()
+	return result
+
+
+def content_fingerprint(value: Any, memo: Optional[Dict[int, Optional[str]]]=None)->Optional[str]:
+	"""
+	Return a hash of everything that determines the content of a dictionary (or of any other value):
+	the `SingleDictionary` data, the structure of the tree, the code of the user functions together with the
+	values of their defaults, closures and referenced globals, the keys of the stroke type and the source of this library.
+	Modules (and the classes they define) are identified by their name, and by the content of their file
+	unless they are in the standard library.
+
+	Return None if some part cannot be fingerprinted reliably, for example an object whose `repr` contains its address.
+
+	Arguments:
+		memo: fingerprints of dictionary nodes already computed, by id.
+	"""
+	import hashlib
+	import types
+	if memo is None: memo={}
+	in_progress: set=set()
+	standard_modules=getattr(sys, "stdlib_module_names", frozenset())|set(sys.builtin_module_names)
+
+	def module_source(name: str)->Optional[str]:
+		"""
+		Return the hash of the source file of a module, "" if it's in the standard library, or None if unknown.
+		"""
+		if name.partition(".")[0] in standard_modules: return ""
+		path=getattr(sys.modules.get(name), "__file__", None)
+		if path is None: return None
+		try:
+			return _file_hash(path)
+		except OSError:
+			return None
+
+	def node_fingerprint(node: Dictionary)->Optional[str]:
+		if id(node) in memo: return memo[id(node)]
+		if id(node) in in_progress: return "cycle"
+		in_progress.add(id(node))
+		parts: List[Any]=[type(node).__module__, type(node).__qualname__, stroke_type_keys(node.stroke_type)]
+		if isinstance(node, (SingleDictionary, CompiledDictionary)):
+			parts.append(list(node.data.items()))
+		elif isinstance(node, SubsetDictionary):
+			parts.append(node.outline_mask)
+		elif isinstance(node, NamedDictionary):
+			parts.append(node.name)
+		elif isinstance(node, MappedDictionary):
+			parts.append(node.mapped_function)
+		elif isinstance(node, FilteredDictionary):
+			parts.append(node.condition)
+		elif isinstance(node, RawMappedDictionary):
+			parts.append(node.raw_mapped_function)
+		elif isinstance(node, ProductDictionary):
+			parts.append(node.merge)
+		elif isinstance(node, ChainProductDictionary):
+			parts.append(node.merges)
+		elif not isinstance(node, (AlternativeDictionary, CachedDictionary)):
+			parts.append(node.__dict__)  # unknown dictionary type
+		parts.append(node.children())
+		result=value_fingerprint(parts)
+		in_progress.discard(id(node))
+		memo[id(node)]=result
+		return result
+
+	def value_fingerprint(value: Any)->Optional[str]:
+		hasher=hashlib.sha256()
+		def update(value: Any)->bool:
+			if isinstance(value, Dictionary):
+				fingerprint=node_fingerprint(value)
+				if fingerprint is None: return False
+				hasher.update(b"D"+fingerprint.encode())
+			elif value is None or isinstance(value, (bool, int, float, str, bytes)):
+				hasher.update(type(value).__name__.encode()+repr(value).encode()+b"\0")
+			elif isinstance(value, (tuple, list)):
+				hasher.update(b"(%d" % len(value))
+				return all(update(item) for item in value)
+			elif isinstance(value, (set, frozenset)):
+				fingerprints=sorted(value_fingerprint(item) or "" for item in value)
+				if "" in fingerprints: return False
+				hasher.update(b"{"+"".join(fingerprints).encode())
+			elif isinstance(value, dict):
+				hasher.update(b"[%d" % len(value))
+				return all(update(key) and update(item) for key, item in value.items())
+			elif isinstance(value, types.FunctionType):
+				if id(value) in in_progress:
+					hasher.update(b"cycle"+value.__qualname__.encode())
+					return True
+				in_progress.add(id(value))
+				code=value.__code__
+				global_names: List[str]=[]
+				def collect(code: types.CodeType)->None:
+					global_names.extend(code.co_names)
+					for constant in code.co_consts:
+						if isinstance(constant, types.CodeType): collect(constant)
+				collect(code)
+				globals_=value.__globals__
+				try:
+					return update([value.__module__, value.__qualname__, code,
+						value.__defaults__, value.__kwdefaults__,
+						[cell.cell_contents for cell in value.__closure__ or ()],
+						[(name, globals_[name]) for name in global_names if name in globals_]])
+				finally:
+					in_progress.discard(id(value))
+			elif isinstance(value, types.CodeType):
+				return update([value.co_code, value.co_consts, value.co_names, value.co_varnames, value.co_argcount, value.co_kwonlyargcount, value.co_flags])
+			elif isinstance(value, types.MethodType):
+				return update(["method", value.__func__, value.__self__])
+			elif isinstance(value, functools.partial):
+				return update(["partial", value.func, value.args, value.keywords])
+			elif isinstance(value, types.ModuleType):
+				source=module_source(value.__name__)
+				if source is None: return False
+				hasher.update(b"M"+value.__name__.encode()+b"\0"+source.encode())
+			elif isinstance(value, type):
+				source=module_source(value.__module__)
+				if source is None: return False
+				hasher.update(b"T"+value.__module__.encode()+b"."+value.__qualname__.encode()+b"\0"+source.encode())
+			elif isinstance(value, types.BuiltinFunctionType):
+				hasher.update(b"T"+getattr(value, "__module__", "").encode()+b"."+value.__qualname__.encode())
+			else:
+				text=repr(value)
+				if " at 0x" in text: return False
+				hasher.update(b"R"+type(value).__qualname__.encode()+text.encode())
+			return True
+		if not update(value): return None
+		return hasher.hexdigest()
+
+	result=value_fingerprint(value)
+	return None if result is None else value_fingerprint([_file_hash(__file__), result])
+
+
+@dataclass
+class MemoStatistics:
+	"""
+	Statistics of a memoized node recorded by `SharedMemo`.
+	"""
+	occurrences: int=0  # number of parents (including the parents of structurally equal nodes)
+	items_calls: int=0
+	items_hits: int=0  # calls that were served from the memoized enumeration
+	items_stored: int=0
+	bytes_stored: int=0  # estimated with sys.getsizeof
+	lookup_calls: int=0
+	lookup_hits: int=0
+
+
+class SharedMemo:
+	"""
+	Share one memoized enumeration and one lookup cache between all the occurrences of each node
+	used more than once in a dictionary. See `Dictionary.memoized`.
+
+	While active, `lookup` and `items` of the shared nodes are replaced by memoized wrappers set as instance attributes;
+	those are removed (and the memory released) on exit.
+
+	Arguments:
+		max_bytes: the estimated total size of the memoized enumerations, or None for no limit.
+			The enumerations that would exceed it are not memoized.
+		structural: if True, structurally equal subtrees (see `structural_key`) are shared too.
+		lookup_cache_size: the maximum number of entries of each lookup cache. When a cache is full, it is cleared.
+	"""
+	def __init__(self, root: Dictionary, max_bytes: Optional[int]=256<<20, structural: bool=False, lookup_cache_size: int=65536)->None:
+		self.root=root
+		self.max_bytes=max_bytes
+		self.structural=structural
+		self.lookup_cache_size=lookup_cache_size
+		self.bytes_used: int=0
+		self.peak_bytes: int=0
+		self.statistics: Dict[Any, MemoStatistics]={}  # by memo key
+		self._labels: Dict[Any, str]={}
+		self._nodes: List[Dictionary]=[]
+
+	def _shared_nodes(self)->List[Tuple[Dictionary, Any]]:
+		"""
+		Return the nodes to memoize, each with its memo key.
+		"""
+		occurrences: Dict[int, int]={}
+		nodes: Dict[int, Dictionary]={}
+		pending=[self.root]
+		while pending:
+			node=pending.pop()
+			if id(node) in nodes: continue
+			nodes[id(node)]=node
+			for child in node.children():
+				occurrences[id(child)]=occurrences.get(id(child), 0)+1
+				pending.append(child)
+		structural_keys: Dict[int, Any]={}
+		keys={node_id: structural_key(node, structural_keys) if self.structural else node_id for node_id, node in nodes.items()}
+		key_occurrences: Dict[Any, int]={}
+		for node_id, count in occurrences.items():
+			key_occurrences[keys[node_id]]=key_occurrences.get(keys[node_id], 0)+count
+		for node_id, node in nodes.items():
+			key=keys[node_id]
+			if key_occurrences.get(key, 0)>1 and key not in self.statistics:
+				self.statistics[key]=MemoStatistics(occurrences=key_occurrences[key])
+				self._labels[key]=node_label(node)
+		return [(node, keys[node_id]) for node_id, node in nodes.items() if keys[node_id] in self.statistics]
+
+	def _memoize(self, node: Dictionary, key: Any, items_memo: Dict[Any, List[Tuple[Strokes, Any]]], lookup_caches: Dict[Any, Dict[Strokes, Any]])->None:
+		statistics=self.statistics[key]
+		original_lookup=node.lookup
+		original_items=node.items
+		lookup_cache=lookup_caches.setdefault(key, {})
+		lookup_cache_size=self.lookup_cache_size
+
+		def lookup(strokes: Strokes)->Any:
+			statistics.lookup_calls+=1
+			try:
+				result=lookup_cache[strokes]
+			except KeyError:
+				result=original_lookup(strokes)
+				if len(lookup_cache)>=lookup_cache_size: lookup_cache.clear()
+				lookup_cache[strokes]=result
+				return result
+			statistics.lookup_hits+=1
+			return result
+
+		def items()->Iterable[Tuple[Strokes, Any]]:
+			statistics.items_calls+=1
+			if key in items_memo:
+				statistics.items_hits+=1
+				yield from items_memo[key]
+				return
+			stored: Optional[List[Tuple[Strokes, Any]]]=[]
+			size=0
+			try:
+				for item in original_items():
+					if stored is not None:
+						item_size=sys.getsizeof(item[0])+sys.getsizeof(item[1])
+						if self.max_bytes is not None and self.bytes_used+item_size>self.max_bytes:
+							self.bytes_used-=size
+							stored=None
+						else:
+							stored.append(item)
+							size+=item_size
+							self.bytes_used+=item_size
+							if self.bytes_used>self.peak_bytes: self.peak_bytes=self.bytes_used
+					yield item
+			except BaseException:
+				if stored is not None: self.bytes_used-=size
+				raise
+			if stored is not None:
+				if key in items_memo:  # completed by a nested enumeration of the same node
+					self.bytes_used-=size
+				else:
+					items_memo[key]=stored
+					statistics.items_stored=len(stored)
+					statistics.bytes_stored=size
+
+		node.lookup=lookup  # type: ignore
+		node.items=items  # type: ignore
+
+	def activate(self)->None:
+		assert not self._nodes, "SharedMemo is already active"
+		self._items_memo: Dict[Any, List[Tuple[Strokes, Any]]]={}
+		lookup_caches: Dict[Any, Dict[Strokes, Any]]={}
+		for node, key in self._shared_nodes():
+			assert "lookup" not in node.__dict__, f"{node_label(node)} is already instrumented or memoized"
+			self._memoize(node, key, self._items_memo, lookup_caches)
+			self._nodes.append(node)
+
+	def deactivate(self)->None:
+		for node in self._nodes:
+			del node.lookup  # type: ignore
+			del node.items  # type: ignore
+		self._nodes=[]
+		self._items_memo={}
+		self.bytes_used=0
+
+	def __enter__(self)->"SharedMemo":
+		self.activate()
+		return self
+
+	def __exit__(self, *args: Any)->None:
+		self.deactivate()
+
+	def report(self)->str:
+		"""
+		Return the recorded statistics of each memoized node, with sizes in KiB.
+		"""
+		lines=[f"{len(self.statistics)} shared nodes, {self.bytes_used/1024:.1f} KiB of memoized items (peak {self.peak_bytes/1024:.1f} KiB"
+				+("" if self.max_bytes is None else f", limit {self.max_bytes/1024:.1f} KiB")+")"]
+		for key, statistics in self.statistics.items():
+			lines.append(f"  {self._labels[key]} x{statistics.occurrences}: "
+					f"items {statistics.items_calls} calls, {statistics.items_hits} memoized, "
+					f"{statistics.items_stored} items stored ({statistics.bytes_stored/1024:.1f} KiB); "
+					f"lookup {statistics.lookup_calls} calls, {statistics.lookup_hits} cached")
+		return "\n".join(lines)
+
+
+class ReverseIndex:
+	"""
+	An index from translations to outlines. See `Dictionary.reverse_index`.
+
+	Only the first value of each outline is indexed, which is what `lookup` returns.
+	"""
+	def __init__(self, items: Iterable[Tuple[str, str]])->None:
+		self._outlines: Dict[str, List[str]]={}
+		seen: set=set()
+		for outline, translation in items:
+			if outline in seen: continue
+			seen.add(outline)
+			self._outlines.setdefault(translation, []).append(outline)
+		self._translations: Optional[List[str]]=None
+		self._text: Optional[str]=None
+		self._offsets: Optional[List[int]]=None
+
+	def lookup(self, translation: str)->List[Tuple[str, ...]]:
+		return [tuple(outline.split("/")) for outline in self._outlines.get(translation, ())]
+
+	def _sorted_translations(self)->List[str]:
+		if self._translations is None:
+			self._translations=sorted(self._outlines)
+		return self._translations
+
+	def prefix_search(self, prefix: str)->Iterable[Tuple[str, List[Tuple[str, ...]]]]:
+		"""
+		Return the translations that start with `prefix` in sorted order, each with its outlines.
+		"""
+		import bisect
+		translations=self._sorted_translations()
+		for i in range(bisect.bisect_left(translations, prefix), len(translations)):
+			if not translations[i].startswith(prefix): break
+			yield translations[i], self.lookup(translations[i])
+
+	def substring_search(self, substring: str)->Iterable[Tuple[str, List[Tuple[str, ...]]]]:
+		"""
+		Return the translations that contain `substring` in sorted order, each with its outlines.
+		"""
+		import bisect
+		translations=self._sorted_translations()
+		if not translations: return
+		if self._text is None:
+			# search in a single string, so that the scan is done by str.find
+			self._text="\0".join(translations)
+			self._offsets=list(itertools.accumulate((len(translation)+1 for translation in translations[:-1]), initial=0))
+		assert self._offsets is not None
+		start=0
+		while True:
+			position=self._text.find(substring, start)
+			if position<0: return
+			i=bisect.bisect_right(self._offsets, position)-1
+			end=self._offsets[i]+len(translations[i])
+			if position+len(substring)<=end:
+				yield translations[i], self.lookup(translations[i])
+				start=end+1
+			else:
+				start=position+1
+
+	_FORMAT=1  # version of the saved file
+
+	def save(self, path: str, key: Optional[str]=None)->None:
+		"""
+		Save the index to a JSON file, together with `key` (which identifies the content of the dictionary).
+		"""
+		import json
+		with open(path, "w", encoding="utf-8") as f:
+			json.dump({"format": self._FORMAT, "key": key, "outlines": self._outlines}, f, ensure_ascii=False)
+
+	@staticmethod
+	def load(path: str, key: Optional[str]=None)->Optional["ReverseIndex"]:
+		"""
+		Load an index saved by `save`. Return None if the file is missing or invalid,
+		or if `key` is given and the index was saved with another key.
+		"""
+		import json
+		try:
+			with open(path, encoding="utf-8") as f:
+				data=json.load(f)
+		except (OSError, ValueError):
+			return None
+		if not isinstance(data, dict) or data.get("format")!=ReverseIndex._FORMAT: return None
+		if key is not None and data.get("key")!=key: return None
+		index=ReverseIndex(())
+		index._outlines=data["outlines"]
+		return index
+
+
+_TRIE_VALUE=-1  # the key of the value in a trie node, the other keys are strokes (as int)
+
+class StrokeTrie:
+	"""
+	A trie of outlines, where each node is a dict from the next stroke (as int) to the child node.
+	See `Dictionary.stroke_trie`.
+
+	Only the first value of each outline is kept, which is what `lookup` returns.
+	"""
+	def __init__(self, stroke_type: type, items: Iterable[Tuple[Strokes, Any]])->None:
+		self.stroke_type=stroke_type
+		self._root: Dict[int, Any]={}
+		for strokes, value in items:
+			node=self._root
+			for stroke in strokes:
+				node=node.setdefault(int(stroke), {})
+			node.setdefault(_TRIE_VALUE, value)
+
+	def _node(self, strokes: Sequence[InputStrokeType])->Optional[Dict[int, Any]]:
+		node: Optional[Dict[int, Any]]=self._root
+		for stroke in strokes:
+			node=node.get(int(to_stroke(self.stroke_type, stroke)))  # type: ignore
+			if node is None: return None
+		return node
+
+	def lookup(self, strokes: Sequence[InputStrokeType])->Any:
+		node=self._node(strokes)
+		return None if node is None else node.get(_TRIE_VALUE)
+
+	def has_prefix(self, strokes: Sequence[InputStrokeType])->bool:
+		"""
+		Return whether some outline starts with `strokes` (or is equal to it).
+		"""
+		node=self._node(strokes)
+		return bool(node)
+
+	def segment(self, strokes: Iterable[InputStrokeType])->Iterator[Tuple[Strokes, Any]]:
+		"""
+		Split a stream of strokes into outlines, translating them greedily:
+		at each position, the longest outline in the trie is taken.
+		A stroke that does not start any outline is returned alone, with value None.
+
+		The strokes are read lazily, at most the length of the longest outline ahead.
+		"""
+		stroke_type=self.stroke_type
+		iterator=iter(strokes)
+		buffer: List[BaseStroke]=[]
+		exhausted=False
+		while True:
+			node=self._root
+			match_length=0
+			match_value=None
+			i=0
+			while True:
+				if i==len(buffer):
+					if exhausted: break
+					stroke=next(iterator, None)
+					if stroke is None:
+						exhausted=True
+						break
+					buffer.append(to_stroke(stroke_type, stroke))
+				node=node.get(int(buffer[i]))
+				if node is None: break
+				i+=1
+				if _TRIE_VALUE in node:
+					match_length=i
+					match_value=node[_TRIE_VALUE]
+			if not buffer: return
+			if match_length==0:
+				yield (buffer[0],), None
+				del buffer[0]
+			else:
+				yield tuple(buffer[:match_length]), match_value
+				del buffer[:match_length]
+
+
+class PackedOutlineTable(collections.abc.Mapping):
+	"""
+	A read-only mapping from outlines to str stored in a single buffer (bytes or a memory-mapped file),
+	which takes much less memory than a dict of tuples of strokes.
+
+	Layout (integers are little-endian unless stated otherwise):
+		header (see HEADER)
+		lengths: longest_key+1 bytes, 1 if there is an outline of that length and 0 otherwise
+		outline masks: for each length present, the union mask of the outlines with that length (length strokes)
+		records: count fixed-size records, sorted -- each is the length of the outline (2 bytes) followed by
+			longest_key strokes padded with zeros, all big-endian so that sorting the records as bytes is well-defined
+		order: count u32, the sorted position of each outline in the original order
+		offsets: count+1 u64, the offset of the value of each sorted position in the string table
+		string table: the values encoded in UTF-8
+
+	Lookup is a binary search over the records. Iteration follows the original order.
+	"""
+	MAGIC=b"PPDLPAK2"
+	HEADER=struct.Struct("<8s32sBHhI")  # magic, key, stroke width in bytes, longest key, outline length (-1 if unknown), count
+
+	def __init__(self, stroke_type: type, buffer: Any)->None:
+		magic, self.key, self._width, self.longest_key, outline_length, self._count=self.HEADER.unpack_from(buffer, 0)
+		if magic!=self.MAGIC: raise ValueError("Not a packed outline table")
+		self.stroke_type=stroke_type
+		self._buffer=buffer
+		self.outline_length: Optional[int]=None if outline_length<0 else outline_length
+		position=self.HEADER.size
+		lengths=buffer[position:position+self.longest_key+1] if self._count else b""
+		position+=len(lengths)
+		self._outline_masks: Dict[int, Tuple[int, ...]]={}
+		for length, present in enumerate(lengths):
+			if present:
+				self._outline_masks[length]=tuple(map(int, self._decode_strokes(position, length)))
+				position+=length*self._width
+		self.outline_mask: Optional[Strokes]=None
+		if self.outline_length:
+			self.outline_mask=tuple(int.__new__(stroke_type, mask) for mask in self._outline_masks[self.outline_length])
+		self._record_size=2+self.longest_key*self._width
+		self._records=position
+		self._order=self._records+self._count*self._record_size
+		self._offsets=self._order+self._count*4
+		self._strings=self._offsets+(self._count+1)*8
+
+	def _decode_strokes(self, position: int, length: int)->Strokes:
+		width=self._width
+		buffer=self._buffer
+		return tuple(int.__new__(self.stroke_type, int.from_bytes(buffer[position+i*width:position+(i+1)*width], "big"))
+				for i in range(length))
+
+	def _record(self, strokes: Strokes)->Optional[bytes]:
+		if len(strokes)>self.longest_key: return None
+		try:
+			return len(strokes).to_bytes(2, "big")+b"".join(int(stroke).to_bytes(self._width, "big") for stroke in strokes)+\
+					bytes((self.longest_key-len(strokes))*self._width)
+		except OverflowError:
+			return None
+
+	def _find(self, strokes: Strokes)->int:
+		"""
+		Return the sorted position of the outline, or -1 if it's not in the table.
+		"""
+		record=self._record(strokes)
+		if record is None: return -1
+		buffer, start, size=self._buffer, self._records, self._record_size
+		low, high=0, self._count
+		while low<high:
+			middle=(low+high)//2
+			if buffer[start+middle*size:start+(middle+1)*size]<record: low=middle+1
+			else: high=middle
+		if low<self._count and buffer[start+low*size:start+(low+1)*size]==record: return low
+		return -1
+
+	def _value(self, index: int)->str:
+		begin, end=struct.unpack_from("<QQ", self._buffer, self._offsets+index*8)
+		return self._buffer[self._strings+begin:self._strings+end].decode("utf-8")
+
+	def _outline(self, index: int)->Strokes:
+		position=self._records+index*self._record_size
+		return self._decode_strokes(position+2, int.from_bytes(self._buffer[position:position+2], "big"))
+
+	def outline_masks(self)->Dict[int, Tuple[int, ...]]:
+		"""
+		Return a dict from each length of the outlines to the union mask of the outlines with that length.
+		"""
+		return dict(self._outline_masks)
+
+	def _sorted_positions(self)->Iterable[int]:
+		for (index,) in struct.iter_unpack("<I", self._buffer[self._order:self._offsets]):
+			yield index
+
+	def __getitem__(self, strokes: Strokes)->str:
+		index=self._find(strokes)
+		if index<0: raise KeyError(strokes)
+		return self._value(index)
+
+	def get(self, strokes: Strokes, default: Any=None)->Any:
+		index=self._find(strokes)
+		if index<0: return default
+		return self._value(index)
+
+	def __contains__(self, strokes: Any)->bool:
+		return self._find(strokes)>=0
+
+	def __len__(self)->int:
+		return self._count
+
+	def __iter__(self)->Iterator[Strokes]:
+		for index in self._sorted_positions():
+			yield self._outline(index)
+
+	def items(self)->Iterable[Tuple[Strokes, str]]:  # type: ignore
+		for index in self._sorted_positions():
+			yield self._outline(index), self._value(index)
+
+	@classmethod
+	def pack(cls, items: Iterable[Tuple[Strokes, Any]], key: bytes=bytes(32))->bytes:
+		"""
+		Serialize the items. If an outline appears more than once, the first value is kept.
+		"""
+		data: Dict[Tuple[int, ...], str]={}
+		for strokes, value in items:
+			if not isinstance(value, str):
+				raise TypeError(f"Only str values can be packed -- got {value!r} for {strokes}")
+			data.setdefault(tuple(map(int, strokes)), value)
+		lengths={len(outline) for outline in data}
+		longest_key=max(lengths, default=0)
+		outline_length=0 if not data else lengths.pop() if len(lengths)==1 else -1
+		width=max(1, (max((stroke for outline in data for stroke in outline), default=0).bit_length()+7)//8)
+
+		outlines=list(data)
+		records=[len(outline).to_bytes(2, "big")+b"".join(stroke.to_bytes(width, "big") for stroke in outline)+
+				bytes((longest_key-len(outline))*width) for outline in outlines]
+		sorted_indices=sorted(range(len(outlines)), key=records.__getitem__)
+		sorted_position=[0]*len(outlines)
+		for position, index in enumerate(sorted_indices): sorted_position[index]=position
+
+		outline_masks=outline_masks_of(outlines)
+		masks=b""
+		if outlines:
+			masks=bytes(length in outline_masks for length in range(longest_key+1))+b"".join(
+					mask.to_bytes(width, "big") for length in sorted(outline_masks) for mask in outline_masks[length])
+		strings=[data[outlines[index]].encode("utf-8") for index in sorted_indices]
+		offsets=list(itertools.accumulate(map(len, strings), initial=0))
+		return b"".join((
+				cls.HEADER.pack(cls.MAGIC, key, width, longest_key, outline_length, len(outlines)),
+				masks,
+				*(records[index] for index in sorted_indices),
+				struct.pack(f"<{len(outlines)}I", *sorted_position),
+				struct.pack(f"<{len(offsets)}Q", *offsets),
+				*strings,
+				))
+
+
+def stroke_type_keys(stroke_type: type)->Tuple[str, ...]:
+	"""
+	Return the keys of the stroke type, in bit order.
+	"""
+	result=[]
+	for bit in itertools.count():
+		try:
+			result.append(str(stroke_type.from_integer(1<<bit)))
+		except ValueError:
+			return tuple(result)
+	assert False
+
+
+def compiled_file(stroke_type: type, path: str, build: Callable[[], Dictionary], sources: Iterable[str])->SingleDictionary:
+	"""
+	Return a dictionary with the same content as `build()`, stored in a memory-mapped file at `path`.
+
+	If the file was created from the same source files and stroke type, it's used directly and `build` is not called.
+	Otherwise `build()` is enumerated and the file is (re)created.
+	All the values of the dictionary must be str.
+
+	On Windows, a file that is still mapped (by a dictionary loaded earlier in the process, for example
+	before Plover reloads the dictionary) cannot be replaced. Then the new content is written to
+	`path` followed by a suffix derived from the sources instead; the files left over from such builds
+	are deleted by the next builds once they are no longer mapped.
+
+	Arguments:
+		sources: the paths of the files the dictionary is defined in, typically `[__file__]`.
+	"""
+	import hashlib
+	import mmap
+	import os
+	hasher=hashlib.sha256(PackedOutlineTable.MAGIC)
+	hasher.update(repr(stroke_type_keys(stroke_type)).encode("utf-8"))
+	for source in sources:
+		with open(source, "rb") as f:
+			hasher.update(hashlib.sha256(f.read()).digest())
+	key=hasher.digest()
+	alternative_path=f"{path}.{key.hex()[:16]}"
+
+	def load(path: str)->Optional[SingleDictionary]:
+		try:
+			with open(path, "rb") as f:
+				buffer=mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+		except (OSError, ValueError):  # missing or empty file
+			return None
+		try:
+			table=PackedOutlineTable(stroke_type, buffer)
+		except (ValueError, struct.error):
+			buffer.close()
+			return None
+		if table.key!=key:
+			buffer.close()
+			return None
+		return SingleDictionary(stroke_type, table)
+
+	result=load(path) or load(alternative_path)
+	if result is None:
+		import glob
+		dictionary=build()
+		temporary_path=f"{path}.{os.getpid()}.tmp"
+		with open(temporary_path, "wb") as f:
+			f.write(PackedOutlineTable.pack(dictionary.items(), key))
+		try:
+			os.replace(temporary_path, path)
+			used_path=path
+		except PermissionError:  # Windows: the file is mapped
+			os.replace(temporary_path, alternative_path)
+			used_path=alternative_path
+		for leftover in glob.glob(glob.escape(path)+"."+"[0-9a-f]"*16):
+			if leftover!=used_path:
+				try:
+					os.remove(leftover)
+				except OSError:
+					pass
+		result=load(used_path)
+		assert result is not None
+	return result
+
 
 def stroke(stroke_type: type, strokes: str)->Dictionary:
 	"""
@@ -554,6 +2988,9 @@ class Context:
 	subsetd           : Callable[[Any], SubsetDictionary_]
 	SubsetDictionary  : Callable[[Any], SubsetDictionary_]
 
+	compiled_file     : Callable[..., SingleDictionary_]  # see compiled_file()
+	from_json_file    : Callable[..., SingleDictionary_]  # see SingleDictionary.from_json_file
+
 
 
 
@@ -574,11 +3011,33 @@ def get_context(stroke_type: type)->Context:
 			subsets           =functools.partial(SubsetDictionary,  stroke_type),
 			subsetd           =functools.partial(SubsetDictionary,  stroke_type),
 			SubsetDictionary  =functools.partial(SubsetDictionary,  stroke_type),
+
+			compiled_file     =functools.partial(compiled_file,     stroke_type),
+			from_json_file    =functools.partial(SingleDictionary.from_json_file, stroke_type),
 			)
 
+_stroke_types: Dict[Tuple[Any, ...], type]={}
+_stroke_types_lock=threading.Lock()
+
+def stroke_type_from_system(system: Any)->type:
+	"""
+	Return the stroke type of a steno system.
+
+	Stroke types are shared by all the systems with the same KEYS, IMPLICIT_HYPHEN_KEYS, NUMBER_KEY and NUMBERS
+	in the process, together with their `StrokeCache`, so that strokes of different dictionaries can be compared
+	and the stroke type is only set up once.
+	"""
+	implicit_hyphen_keys=frozenset({*system.IMPLICIT_HYPHEN_KEYS} & {*system.KEYS})
+	numbers=system.NUMBERS
+	key=(tuple(system.KEYS), implicit_hyphen_keys, system.NUMBER_KEY,
+			None if numbers is None else tuple(sorted(numbers.items())))
+	with _stroke_types_lock:
+		stroke_type=_stroke_types.get(key)
+		if stroke_type is None:
+			class Stroke_(BaseStroke): pass
+			Stroke_.setup(system.KEYS, set(implicit_hyphen_keys), system.NUMBER_KEY, numbers)
+			stroke_type=_stroke_types[key]=Stroke_
+	return stroke_type
+
 def get_context_from_system(system: Any)->Context:
-	class Stroke_(BaseStroke): pass
-	Stroke_.setup(system.KEYS,
-			{*system.IMPLICIT_HYPHEN_KEYS} & {*system.KEYS},
-			system.NUMBER_KEY, system.NUMBERS)
-	return get_context(Stroke_)
+	return get_context(stroke_type_from_system(system))
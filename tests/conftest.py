@@ -0,0 +1,9 @@
+import pytest
+
+from benchmarks.system import english_stenotype
+from plover_python_dictionary_lib import get_context_from_system, Context
+
+
+@pytest.fixture
+def context()->Context:
+	return get_context_from_system(english_stenotype)
@@ -0,0 +1,27 @@
+from plover_python_dictionary_lib import AlternativeDictionary
+
+
+def test_lookup_order(context):
+	a=context.s({"S": "a", "T": "a"})
+	b=context.s({"S": "b", "K": "b", "K/K": "bb"})
+	c=context.s({"T": "c"}).map(str.upper)
+	d=context.s({"T": "d", "P": "d"})
+	alternative=a|b|c|d
+	assert isinstance(alternative, AlternativeDictionary)
+	outlines=["S", "T", "K", "K/K", "P", "W", "K/T"]
+	expected=["a", "a", "b", "bb", "d", None, None]
+	assert [alternative.lookup_str(outline) for outline in outlines]==expected
+	assert alternative.lookup_many(outlines)==expected
+	assert (c|d).lookup_str("T")=="C"
+
+
+def test_lookup_instrumented(context):
+	a=context.s({"S": "a"})
+	b=context.s({"T": "b"})
+	alternative=a|b
+	with alternative.instrumented() as instrumentation:
+		assert alternative.lookup_str("T")=="b"
+		assert alternative.lookup_many(["S", "T", "K"])==["a", "b", None]
+	assert instrumentation.statistics[id(a)].lookup_calls==1
+	assert instrumentation.statistics[id(b)].lookup_calls==2
+	assert instrumentation.statistics[id(b)].lookup_hits==2
@@ -0,0 +1,132 @@
+import mmap
+
+import pytest
+
+from plover_python_dictionary_lib import PackedOutlineTable, SingleDictionary, Dictionary
+
+
+def assert_same_content(packed: Dictionary, source: Dictionary)->None:
+	assert list(packed.items_str())==list(source.items_str())
+	for outline, value in source.items_str():
+		assert packed.lookup_str(outline)==value
+	assert packed.lookup_str("STKPWHR/STKPWHR")==source.lookup_str("STKPWHR/STKPWHR")
+
+
+def pack_and_load(context, source: Dictionary)->SingleDictionary:
+	return SingleDictionary(context.stroke_type, PackedOutlineTable(context.stroke_type, PackedOutlineTable.pack(source.items())))
+
+
+def test_pack_fixed_length(context):
+	source=context.s({"S": "s", "KPWR": "you", "-T": "the", "TWH": "they", "#S": "1"})
+	packed=pack_and_load(context, source)
+	assert_same_content(packed, source)
+	assert packed.outline_length==1
+	assert packed.longest_key==1
+	assert packed.outline_mask==source.outline_mask
+	assert packed.outline_masks()==source.outline_masks()
+	assert packed.lookup_str("-D") is None
+
+
+def test_pack_mixed_length(context):
+	source=context.s({"S/T": "st", "K": "k", "TWH/-R/-S": "theirs", "-Z": "z"})
+	packed=pack_and_load(context, source)
+	assert_same_content(packed, source)
+	assert packed.outline_length is None
+	assert packed.outline_mask is None
+	assert packed.longest_key==3
+	assert packed.outline_masks()==source.outline_masks()
+	assert packed.lookup_str("S") is None
+
+
+def test_pack_empty(context):
+	table=PackedOutlineTable(context.stroke_type, PackedOutlineTable.pack([]))
+	assert len(table)==0
+	assert list(table.items())==[]
+	packed=SingleDictionary(context.stroke_type, table)
+	assert packed.outline_length==0
+	assert packed.longest_key==0
+	assert packed.lookup_str("S") is None
+
+
+def test_pack_keeps_first_value(context):
+	source=context.s({"S": "first"}) | context.s({"S": "second", "T": "t"})
+	packed=pack_and_load(context, source)
+	assert list(packed.items_str())==[("S", "first"), ("T", "t")]
+	assert packed.lookup_str("S")=="first"
+
+
+def test_pack_rejects_non_str(context):
+	with pytest.raises(TypeError):
+		PackedOutlineTable.pack(context.subsets("STK").items())
+
+
+def test_pack_product(context):
+	source=context.subsets("STKP").map(str)*context.s({"-T": "t", "-D": "d"})
+	assert_same_content(pack_and_load(context, source), source)
+
+
+def test_compiled_file_round_trip(context, tmp_path):
+	source_file=tmp_path/"dictionary.py"
+	source_file.write_text("version 1")
+	path=str(tmp_path/"dictionary.cache")
+	source=context.s({"S/T": "st", "K": "k", "TWH": "they"})
+	builds=[]
+	def build()->Dictionary:
+		builds.append(1)
+		return source
+
+	first=context.compiled_file(path, build=build, sources=[str(source_file)])
+	assert isinstance(first.data._buffer, mmap.mmap)
+	assert_same_content(first, source)
+	second=context.compiled_file(path, build=build, sources=[str(source_file)])
+	assert_same_content(second, source)
+	assert len(builds)==1
+
+
+def test_compiled_file_invalidation(context, tmp_path):
+	source_file=tmp_path/"dictionary.py"
+	source_file.write_text("version 1")
+	path=tmp_path/"dictionary.cache"
+	old=context.s({"S": "old"})
+	new=context.s({"S": "new", "T": "t"})
+
+	assert context.compiled_file(str(path), build=lambda: old, sources=[str(source_file)]).lookup_str("S")=="old"
+	# the source did not change: the file is used even if the dictionary would be different
+	assert context.compiled_file(str(path), build=lambda: new, sources=[str(source_file)]).lookup_str("S")=="old"
+	source_file.write_text("version 2")
+	assert_same_content(context.compiled_file(str(path), build=lambda: new, sources=[str(source_file)]), new)
+
+	path.write_bytes(b"garbage")
+	assert_same_content(context.compiled_file(str(path), build=lambda: old, sources=[str(source_file)]), old)
+	path.write_bytes(b"")
+	assert_same_content(context.compiled_file(str(path), build=lambda: new, sources=[str(source_file)]), new)
+
+
+def test_compiled_file_mapped(context, tmp_path, monkeypatch):
+	"""
+	Simulate Windows, where a memory-mapped file cannot be replaced.
+	"""
+	import os
+	source_file=tmp_path/"dictionary.py"
+	source_file.write_text("version 1")
+	path=str(tmp_path/"dictionary.cache")
+	old=context.s({"S": "old"})
+	new=context.s({"S": "new", "T": "t"})
+	loaded=context.compiled_file(path, build=lambda: old, sources=[str(source_file)])
+
+	replace=os.replace
+	def replace_unless_mapped(source: str, target: str)->None:
+		if target==path: raise PermissionError(target)
+		replace(source, target)
+	monkeypatch.setattr(os, "replace", replace_unless_mapped)
+	source_file.write_text("version 2")
+	assert_same_content(context.compiled_file(path, build=lambda: new, sources=[str(source_file)]), new)
+	assert_same_content(loaded, old)
+	assert_same_content(context.compiled_file(path, build=lambda: old, sources=[str(source_file)]), new)
+	assert len(os.listdir(tmp_path))==3
+
+	# once the file can be replaced again, the left-over file is deleted
+	monkeypatch.setattr(os, "replace", replace)
+	source_file.write_text("version 3")
+	assert_same_content(context.compiled_file(path, build=lambda: old, sources=[str(source_file)]), old)
+	assert sorted(os.listdir(tmp_path))==["dictionary.cache", "dictionary.py"]
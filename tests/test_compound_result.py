@@ -0,0 +1,50 @@
+import pickle
+
+from plover_python_dictionary_lib import CompoundResult, RawMappedDictionary
+
+
+def test_constructors():
+	result=CompoundResult({"a": 1, "b": 2})
+	assert result.names==("a", "b")
+	assert result.values==(1, 2)
+	assert CompoundResult.from_dict({"a": 1, "b": 2})==result
+	assert CompoundResult(data={"a": 1, "b": 2})==result
+	assert CompoundResult().data=={}
+	assert CompoundResult(names=("a", "b"), values=(1, 2))==result
+	assert CompoundResult(names=("b", "a"), values=(2, 1))==result
+	assert repr(CompoundResult(names=("a",), values=(1,)))=="CompoundResult(data={'a': 1})"
+	assert pickle.loads(pickle.dumps(result))==result
+
+
+def test_data_is_persistent():
+	result=CompoundResult(names=("a", "b"), values=(1, 2))
+	result.data["a"]=3
+	assert result.data=={"a": 3, "b": 2}
+	assert result.values==(3, 2)
+
+
+def test_modified_data_in_product(context):
+	def modify(strokes, result):
+		result.data["a"]=result.data["a"].upper()
+		return result
+
+	product=RawMappedDictionary(context.stroke_type, context.s({"S": "s"}).named("a"), modify)*context.s({"-T": "t"}).named("b")
+	assert product.map(lambda a, b: a+b).lookup_str("S-T")=="St"
+
+	def add_group(strokes, result):
+		result.data["c"]="c"
+		return result
+
+	product=RawMappedDictionary(context.stroke_type, context.s({"S": "s"}).named("a"), add_group)*context.s({"-T": "t"}).named("b")
+	assert product.map(lambda a, b, c: a+b+c).lookup_str("S-T")=="stc"
+
+
+def test_modified_data_not_shared(context):
+	def modify(strokes, result):
+		result.data["b"]+="!"
+		return result
+
+	product=context.s({"S": "", "T": "", "K": ""})*context.s({"-Z": "z"}).named("b")
+	mapped=RawMappedDictionary(context.stroke_type, product, modify).map(lambda b: b)
+	assert [value for _strokes, value in mapped.items()]==["z!", "z!", "z!"]
+	assert [value for _strokes, value in mapped.items()]==["z!", "z!", "z!"]
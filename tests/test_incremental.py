@@ -0,0 +1,31 @@
+import importlib
+import json
+import sys
+
+
+def test_incremental_unchanged(context, tmp_path):
+	path=str(tmp_path/"out.json")
+	dictionary=context.s({"S": "a"}) | context.s({"T": "b"}).map(str.upper)
+	assert dictionary.write_json_incremental(path)==2
+	assert dictionary.write_json_incremental(path)==0
+	with open(path, encoding="utf-8") as f:
+		assert json.load(f)=={"S": "a", "T": "B"}
+
+
+def test_incremental_module_changed(context, tmp_path, monkeypatch):
+	helpers_path=tmp_path/"incremental_helpers.py"
+	helpers_path.write_text("def fmt(result):\n\treturn result.upper()\n")
+	monkeypatch.syspath_prepend(str(tmp_path))
+	helpers=importlib.import_module("incremental_helpers")
+	try:
+		path=str(tmp_path/"out.json")
+		dictionary=context.s({"S": "a"}).map(lambda result: helpers.fmt(result)) | context.s({"T": "b"})
+		assert dictionary.write_json_incremental(path)==2
+
+		helpers_path.write_text("def fmt(result):\n\treturn result.upper()+'!'\n")
+		importlib.reload(helpers)
+		assert dictionary.write_json_incremental(path)==1
+		with open(path, encoding="utf-8") as f:
+			assert json.load(f)=={"S": "A!", "T": "b"}
+	finally:
+		del sys.modules["incremental_helpers"]
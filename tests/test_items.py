@@ -0,0 +1,39 @@
+import pytest
+
+
+@pytest.fixture
+def dictionaries(context):
+	s=context.s
+	return [
+			s({"A": "1", "KR": "5"}) | s({"A": "2"}),
+			(s({"A": "1", "KR": "5"}) | s({"A": "2"})).filter(lambda result: result!="1"),
+			(s({"A": "1", "KR": "5"}) | s({"A": "2"})).map(lambda result: None if result=="2" else result),
+			s({"S": "s", "T": "t"})*(s({"-E": "e"}) | s({"-U": "u"}).filter(lambda result: False) | s({"-E": "e2"})),
+			s({"S": lambda x: None, "T": lambda x: x})*s({"-E": "e", "-U": "u"}),
+			context.subsets("STK").map(str)/s({"-E": "e", "-U": "u"}),
+			]
+
+
+def test_items_page(dictionaries):
+	for dictionary in dictionaries:
+		items=list(dictionary.items())
+		assert list(dictionary.items_page())==items
+		assert list(dictionary.items_page(2))==items[:2]
+		for strokes, _value in items:
+			index=next(i for i, item in enumerate(items) if item[0]==strokes)
+			assert list(dictionary.items_page(start_after=strokes))==items[index+1:]
+			assert list(dictionary.items_page(1, start_after=strokes))==items[index+1:index+2]
+			assert list(dictionary.items_from(strokes))==items[index:]
+
+
+def test_items_page_dropped_outline(context):
+	dictionary=(context.s({"A": "1", "KR": "5"}) | context.s({"A": "2"})).filter(lambda result: result!="1")
+	assert list(dictionary.items_str())==[("KR", "5"), ("A", "2")]
+	assert list(dictionary.items_page(start_after="A"))==[]
+	assert list(dictionary.items_page(start_after="KR"))==[((context.stroke_type("A"),), "2")]
+	assert list(dictionary.items_page(start_after="TK"))==[]
+
+
+def test_count(dictionaries):
+	for dictionary in dictionaries:
+		assert dictionary.count()==sum(1 for _ in dictionary.items())
@@ -0,0 +1,41 @@
+import pytest
+
+
+@pytest.fixture
+def dictionaries(context):
+	s=context.s
+	product=context.subsets("STK").map(str)*s({"-E": "e", "-U": "u"})
+	alternative=s({"S/T": "st", "K": "k"}) | product | s({"S": "s"}) | s({"TK": "tk"}).map(str.upper)
+	return [
+			s({"S/T": "st", "K": "k"}),
+			product,
+			alternative,
+			alternative.optimize(),
+			alternative.cached(),
+			alternative.compiled(),
+			(product/s({"S": "!"})).filter(lambda result: not result.startswith("S")),
+			(product*s({"-Z": "z"})*s({"-D": "d"})).optimize(),
+			]
+
+
+def lookup_or_none(dictionary, outline):
+	try:
+		return dictionary.lookup_tuple(outline.split("/") if isinstance(outline, str) else outline)
+	except KeyError:
+		return None
+
+
+def test_lookup_many(dictionaries):
+	outlines=["S/T", "K", "SE", ("S", "T"), "TKU", "TK", "Q", "S/Q", ("K", "invalid"), "STKE", "STKE/S", "STKEZD", "", "S/T/K"]
+	for dictionary in dictionaries:
+		results=dictionary.lookup_many(outlines)
+		assert len(results)==len(outlines)
+		assert results==[lookup_or_none(dictionary, outline) for outline in outlines]
+		# invalid outlines give None at their positions
+		assert results[6] is None and results[7] is None and results[8] is None
+		assert dictionary.lookup_many([])==[]
+
+
+def test_lookup_many_values(context, dictionaries):
+	alternative=dictionaries[2]
+	assert alternative.lookup_many(["Q", "S/T", "S/Q", "SE", "TK", "S", "K/K"])==[None, "st", None, "Se", "TK", "s", None]
@@ -0,0 +1,80 @@
+from plover_python_dictionary_lib import structural_key
+
+
+def test_structural_key_value_types(context):
+	s=context.s
+	assert structural_key(s({"S": 1}))!=structural_key(s({"S": 1.0}))
+	assert structural_key(s({"S": 1}))==structural_key(s({"S": 1}))
+	dictionary=(s({"S": 1})/s({"S": 1})).map(str) | (s({"S": 1.0})/s({"S": 1.0})).map(str)
+	expected=list(dictionary.items())
+	assert [value for _strokes, value in expected]==["2", "2.0"]
+	with dictionary.memoized(structural=True):
+		assert list(dictionary.items())==expected
+
+
+def shared_dictionary(context):
+	shared=context.subsets("STKPW").map(str)
+	other=context.subsets("HR").map(lambda result: str(result).lower())
+	return shared, other, (shared*context.s({"-E": "e"})) | (shared*context.s({"-U": "u"})) | (other*context.s({"-Z": "z"})) | (other*context.s({"-D": "d"}))
+
+
+def test_memoized_items(context):
+	shared, other, dictionary=shared_dictionary(context)
+	expected=list(dictionary.items())
+	with dictionary.memoized() as memo:
+		assert list(dictionary.items())==expected
+		assert [dictionary.lookup(strokes) for strokes, _value in expected]==[value for _strokes, value in expected]
+		statistics=memo.statistics[id(shared)]
+		assert statistics.occurrences==2
+		assert statistics.items_calls==2
+		assert statistics.items_hits==1
+		assert statistics.items_stored==32
+		assert memo.bytes_used==memo.peak_bytes>0
+	assert memo.bytes_used==0
+	assert "items" not in vars(shared) and "lookup" not in vars(shared)
+	assert list(dictionary.items())==expected
+
+
+def test_memoized_budget_exceeded(context):
+	shared, other, dictionary=shared_dictionary(context)
+	expected=list(dictionary.items())
+	with dictionary.memoized(max_bytes=None) as memo:
+		list(dictionary.items())
+		other_bytes=memo.statistics[id(other)].bytes_stored
+		shared_bytes=memo.statistics[id(shared)].bytes_stored
+	assert 0<other_bytes<shared_bytes
+
+	# the budget is exceeded in the middle of the enumeration of the first shared node: it is not memoized
+	with dictionary.memoized(max_bytes=shared_bytes//2) as memo:
+		assert list(dictionary.items())==expected
+		assert memo.statistics[id(shared)].items_hits==0
+		assert memo.statistics[id(shared)].items_stored==0
+		assert memo.statistics[id(other)].items_hits==1
+		assert memo.bytes_used==other_bytes
+		assert memo.peak_bytes<=shared_bytes//2
+		assert list(dictionary.items())==expected
+	assert memo.bytes_used==0
+
+
+def test_memoized_interrupted(context):
+	shared, other, dictionary=shared_dictionary(context)
+	expected=list(dictionary.items())
+	with dictionary.memoized() as memo:
+		items=iter(dictionary.items())
+		next(items)
+		items.close()
+		assert memo.bytes_used==0
+		assert list(dictionary.items())==expected
+		assert memo.statistics[id(shared)].items_hits==1
+
+
+def test_memoized_nested(context):
+	other=context.subsets("HR").map(str)
+	dictionary=other/other
+	expected=list(dictionary.items())
+	with dictionary.memoized() as memo:
+		assert list(dictionary.items())==expected
+		assert memo.bytes_used==memo.statistics[id(other)].bytes_stored
+		assert memo.peak_bytes>=memo.bytes_used
+		assert list(dictionary.items())==expected
+		assert memo.statistics[id(other)].items_hits>=1
@@ -0,0 +1,111 @@
+import itertools
+
+import pytest
+
+from plover_python_dictionary_lib import (
+		ChainProductDictionary, ProductDictionary, SingleDictionary, AlternativeDictionary, FilteredDictionary,
+		MappedDictionary, Dictionary,
+		)
+
+
+def assert_equivalent(optimized: Dictionary, original: Dictionary)->None:
+	items=list(original.items())
+	assert list(optimized.items())==items
+	assert optimized.count()==original.count()
+	outlines=[strokes for strokes, _value in items]
+	# some outlines that are not in the dictionary
+	outlines+=[strokes[:-1]+(strokes[-1]|strokes[0],) for strokes in outlines[:50]]+[strokes[1:] for strokes in outlines[:50]]
+	assert optimized.lookup_batch(outlines)==[original.lookup(strokes) for strokes in outlines]
+	assert [optimized.lookup(strokes) for strokes in outlines]==[original.lookup(strokes) for strokes in outlines]
+	for index in (0, 1, len(items)//2, len(items)-2):
+		if 0<=index<len(items):
+			assert list(optimized.items_page(5, start_after=items[index][0]))==list(original.items_page(5, start_after=items[index][0]))
+	for count in (1, 3, 8):
+		assert list(itertools.chain.from_iterable(part() for part in optimized.item_partitions(count)))==items
+
+
+@pytest.fixture
+def parts(context):
+	return (
+			context.s({"S": "s", "STK": "stk", "K": "k"}),
+			context.s({"-E": "e", "-U": "u", "": ""}),
+			context.s({"-T": "t", "-D": "d"}),
+			context.s({"S": "s", "-Z": "z"}),
+			)
+
+
+def test_chain(parts):
+	a, b, c, d=parts
+	for original in (a*b*c/d, ((a/b)*c)/(c*d), a*(b*c)/d, a*(b*(c/d))):
+		optimized=original.optimize()
+		assert isinstance(optimized, ChainProductDictionary)
+		assert len(optimized.factors)>=4
+		assert_equivalent(optimized, original)
+	assert_equivalent((a*b*c/d).optimize(), a*(b*(c/d)).optimize())
+
+
+def test_chain_named(parts):
+	a, b, c, d=parts
+	original=(a.named("a")*(b.named("b")*c.named("c"))).map(lambda a, b, c: a+"-"+b+"-"+c)
+	optimized=original.optimize()
+	assert isinstance(optimized.wrapped, ChainProductDictionary)
+	assert_equivalent(optimized, original)
+
+
+def test_right_nested_callable(context, parts):
+	a, b, c, d=parts
+	function=context.s({"S": lambda x: x.upper(), "K": lambda x: x+"!"})
+	original=function*(b*c)
+	optimized=original.optimize()
+	assert isinstance(optimized, ProductDictionary)
+	assert_equivalent(optimized, original)
+	assert optimized.lookup_str("SET")=="ET"
+
+
+def test_chain_items_cache_limit(parts):
+	a, b, c, d=parts
+	original=a*b*c
+	original.items_cache_limit=1
+	optimized=original.optimize()
+	assert optimized.items_cache_limit==1
+	assert_equivalent(optimized, original)
+
+
+def test_filter_push_down(parts):
+	a, b, c, d=parts
+	original=(a.named("x")*b.named("y")*c.named("z")).filter(lambda x, y, z: x!="k").map(lambda x, y, z: x+y+z)
+	optimized=original.optimize()
+	product=optimized.wrapped
+	assert isinstance(product, ChainProductDictionary)
+	assert isinstance(product.factors[0], FilteredDictionary)
+	assert_equivalent(optimized, original)
+
+	# the condition reads two sides: not pushed down
+	original=(a.named("x")*b.named("y")).filter(lambda x, y: x+y!="se")
+	assert isinstance(original.optimize(), FilteredDictionary)
+	assert_equivalent(original.optimize(), original)
+
+
+def test_map_fusion(parts):
+	a, b, c, d=parts
+	original=a.map(str.upper).filter(lambda result: result!="K").map(lambda result: result+"!")
+	optimized=original.optimize()
+	assert not isinstance(optimized, MappedDictionary) or not isinstance(optimized.wrapped, (MappedDictionary, FilteredDictionary))
+	assert_equivalent(optimized, original)
+
+
+def test_single_merge(context, parts):
+	a, b, c, d=parts
+	original=c|context.s({"-B": "b"})|context.s({"-T": "duplicate"})
+	optimized=original.optimize()
+	assert isinstance(optimized, AlternativeDictionary)
+	assert len(optimized.children())==2
+	assert isinstance(optimized.children()[0], SingleDictionary)
+	assert_equivalent(optimized, original)
+	assert optimized.lookup_str("-T")=="t"
+
+	original=a|d|c
+	optimized=original.optimize()
+	assert len(optimized.children())==2
+	assert_equivalent(optimized, original)
+	assert optimized.lookup_str("S")=="s"
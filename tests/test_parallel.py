@@ -0,0 +1,35 @@
+import io
+import multiprocessing
+
+import pytest
+
+pytestmark=pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="needs fork")
+
+
+@pytest.fixture
+def dictionary(context):
+	s=context.s
+	return (
+			(context.subsets("STK").map(str)*s({"-E": "e", "-U": "u"}))
+			| s({"S": "duplicate", "TE": "duplicate 2"})
+			| (context.subsets("SK").map(lambda result: str(result).lower())*s({"-E": "e"})).filter(lambda result: result!="ke")
+			)
+
+
+def test_parallel_items(dictionary):
+	assert len(dictionary.item_partitions(8))>1
+	items=list(dictionary.items())
+	assert len({strokes for strokes, _value in items})<len(items)
+	parallel=list(dictionary.parallel_items(workers=2))
+	assert parallel==items
+	assert all(type(stroke) is dictionary.stroke_type for strokes, _value in parallel for stroke in strokes)
+	assert list(dictionary.parallel_items(workers=1))==items
+
+
+@pytest.mark.parametrize("duplicates", ["last", "first", "keep"])
+def test_write_json_workers(dictionary, duplicates):
+	serial=io.StringIO()
+	dictionary.write_json(serial, duplicates=duplicates)
+	parallel=io.StringIO()
+	dictionary.write_json(parallel, duplicates=duplicates, workers=3)
+	assert parallel.getvalue()==serial.getvalue()
@@ -0,0 +1,57 @@
+import pytest
+
+from plover_python_dictionary_lib import ReverseIndex, content_fingerprint
+
+
+@pytest.fixture
+def dictionary(context):
+	return context.s({"S": "is", "T": "it", "S/T": "is it", "K": "can", "TK": "it"}) | context.s({"S": "as", "W": "with"})
+
+
+def test_reverse_lookup(dictionary):
+	assert dictionary.reverse_lookup("it")==[("T",), ("TK",)]
+	assert dictionary.reverse_lookup("is it")==[("S", "T")]
+	assert dictionary.reverse_lookup("is")==[("S",)]
+	# only the first value of an outline is indexed
+	assert dictionary.reverse_lookup("as")==[]
+	assert dictionary.reverse_lookup("missing")==[]
+
+
+def test_prefix_search(dictionary):
+	index=dictionary.reverse_index()
+	assert list(index.prefix_search("i"))==[("is", [("S",)]), ("is it", [("S", "T")]), ("it", [("T",), ("TK",)])]
+	assert list(index.prefix_search("is "))==[("is it", [("S", "T")])]
+	assert list(index.prefix_search("x"))==[]
+	assert [translation for translation, _outlines in index.prefix_search("")]==["can", "is", "is it", "it", "with"]
+
+
+def test_substring_search(dictionary):
+	index=dictionary.reverse_index()
+	assert [translation for translation, _outlines in index.substring_search("t")]==["is it", "it", "with"]
+	assert list(index.substring_search("s i"))==[("is it", [("S", "T")])]
+	assert list(index.substring_search("sit"))==[]
+	assert [translation for translation, _outlines in index.substring_search("")]==["can", "is", "is it", "it", "with"]
+
+
+def test_substring_search_empty_translation(context):
+	index=context.s({"S": "", "T": "a"}).reverse_index()
+	assert list(index.substring_search(""))==[("", [("S",)]), ("a", [("T",)])]
+	assert list(index.substring_search("a"))==[("a", [("T",)])]
+
+
+def test_reverse_index_file(context, tmp_path):
+	path=str(tmp_path/"index.json")
+	assert context.s({"S": "is"}).reverse_lookup("is")==[("S",)]
+	assert context.s({"S": "is"}).reverse_index(path).lookup("is")==[("S",)]
+	# the file is reused for the same content
+	assert ReverseIndex.load(path, content_fingerprint(context.s({"S": "is"}))) is not None
+	assert ReverseIndex.load(path, content_fingerprint(context.s({"T": "is"}))) is None
+	assert context.s({"S": "is"}).reverse_index(path).lookup("is")==[("S",)]
+	# and rebuilt when the content changes
+	changed=context.s({"T": "is"})
+	assert changed.reverse_index(path).lookup("is")==[("T",)]
+	assert context.s({"T": "is"}).reverse_index(path).lookup("is")==[("T",)]
+	# another path for the same dictionary is written too
+	other_path=tmp_path/"other.json"
+	assert changed.reverse_index(str(other_path)).lookup("is")==[("T",)]
+	assert other_path.exists()
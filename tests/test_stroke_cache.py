@@ -0,0 +1,9 @@
+from plover_python_dictionary_lib import stroke_cache, StrokeCache
+
+
+def test_stroke_cache_does_not_modify_stroke_type(context):
+	cache=stroke_cache(context.stroke_type)
+	assert isinstance(cache, StrokeCache)
+	assert stroke_cache(context.stroke_type) is cache
+	assert "stroke_cache" not in vars(context.stroke_type)
+	assert cache.parse("STK")==context.stroke_type("STK")
@@ -0,0 +1,50 @@
+import pytest
+
+
+@pytest.fixture
+def dictionary(context):
+	return context.s({"S/T/K": "stk", "S": "s", "T/P": "tp", "K/W/R": "kwr"}) | context.s({"S": "duplicate"})
+
+
+def segment(dictionary, strokes: str):
+	return [("/".join(map(str, outline)), value) for outline, value in dictionary.segment(strokes.split("/"))]
+
+
+def test_segment(dictionary):
+	assert segment(dictionary, "S/T/K/S")==[("S/T/K", "stk"), ("S", "s")]
+	assert segment(dictionary, "T/P/S/T/K")==[("T/P", "tp"), ("S/T/K", "stk")]
+	assert list(dictionary.segment([]))==[]
+
+
+def test_segment_unmatched_prefix(dictionary):
+	# S/T is a prefix of S/T/K but not an outline: the longest match S is taken
+	assert segment(dictionary, "S/T/P")==[("S", "s"), ("T/P", "tp")]
+	# T is a prefix of T/P but has no value: it's returned alone
+	assert segment(dictionary, "T/T/P")==[("T", None), ("T/P", "tp")]
+	assert segment(dictionary, "S/T")==[("S", "s"), ("T", None)]
+	assert segment(dictionary, "K/W/S")==[("K", None), ("W", None), ("S", "s")]
+	assert segment(dictionary, "P/-Z")==[("P", None), ("-Z", None)]
+
+
+def test_segment_lazy(dictionary):
+	read=[]
+	def strokes():
+		for stroke in ["T", "P", "S", "T", "K"]:
+			read.append(stroke)
+			yield stroke
+	segments=dictionary.segment(strokes())
+	assert next(segments)==((dictionary.stroke_type("T"), dictionary.stroke_type("P")), "tp")
+	assert len(read)<=2+3
+
+
+def test_trie(context, dictionary):
+	trie=dictionary.stroke_trie()
+	assert trie.lookup(["S"])=="s"
+	assert trie.lookup(["S", "T"]) is None
+	assert trie.lookup(["S", "T", "K"])=="stk"
+	assert trie.has_prefix(["S", "T"])
+	assert trie.has_prefix(["S", "T", "K"])
+	assert trie.has_prefix([])
+	assert not trie.has_prefix(["S", "T", "K", "S"])
+	assert not trie.has_prefix(["W"])
+	assert not context.s({}).stroke_trie().has_prefix([])
@@ -0,0 +1,25 @@
+from typing import Any, Iterable, Tuple
+
+from plover_python_dictionary_lib import Dictionary
+
+
+class Reversed(Dictionary):
+	"""
+	A user dictionary that only defines the required methods and `longest_key`.
+	"""
+	longest_key=1
+
+	def lookup(self, strokes: Tuple[Any, ...])->Any:
+		if len(strokes)==1: return str(strokes[0])[::-1]
+		return None
+
+	def items(self)->Iterable[Tuple[Tuple[Any, ...], Any]]:
+		return ()
+
+
+def test_minimal_subclass(context):
+	dictionary=Reversed(context.stroke_type)
+	assert dictionary.lookup_str("STK")=="KTS"
+	assert dictionary.lookup_str("S/T") is None
+	assert dictionary.lookup_many(["STK", "S/T"])==["KTS", None]
+	assert (dictionary | context.s({"T/T": "tt"})).lookup_str("T/T")=="tt"
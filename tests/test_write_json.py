@@ -0,0 +1,31 @@
+import io
+import json
+import logging
+
+
+def write_json(dictionary, **kwargs)->str:
+	fp=io.StringIO()
+	dictionary.write_json(fp, **kwargs)
+	return fp.getvalue()
+
+
+def test_duplicates(context, caplog):
+	dictionary=context.s({"S": "a", "T": "t"}) | context.s({"S": "b", "K": "k"}) | context.s({"S": "c"})
+	expected_last=json.dumps(dictionary.items_str_dict(), ensure_ascii=False, indent=0)
+	with caplog.at_level(logging.WARNING):
+		assert write_json(dictionary)==expected_last
+	assert "['a', 'b', 'c']" in caplog.text
+	assert json.loads(expected_last)=={"S": "c", "T": "t", "K": "k"}
+
+	caplog.clear()
+	with caplog.at_level(logging.WARNING):
+		output=write_json(dictionary, duplicates="first")
+	assert output==json.dumps({"S": "a", "T": "t", "K": "k"}, ensure_ascii=False, indent=0)
+	assert "S: ['b', 'c']" in caplog.text
+
+	assert write_json(dictionary, duplicates="keep").count('"S"')==3
+
+
+def test_empty(context):
+	assert write_json(context.s({}))=="{}"
+	assert write_json(context.s({}), duplicates="first")=="{}"